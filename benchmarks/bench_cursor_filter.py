@@ -0,0 +1,171 @@
+"""
+Lag and jitter of the One Euro cursor filter, with and without Kalman
+prediction, against the old per-frame exponential blend.
+
+Feeds nose positions from a recording (see core/recording.py) or a
+synthetic sweep-and-hold path with tracking noise through the cursor
+mapping, filters them and reports:
+
+    lag     shift (ms) that best aligns the filtered path with a zero-phase
+            smoothed copy of the raw cursor target
+    jitter  RMS (px) of what a zero-phase smoother removes from the
+            filtered path while the nose is at rest, i.e. the wobble left
+            in a held cursor
+    column  % of frames whose rhythm-game column (cursor_x // column
+            width) differs from the column under the reference target at
+            display time, i.e. --latency-ms after capture
+
+Synthetic input is run at several frame rates to show how each filter's
+lag changes with FPS.
+
+    python -m benchmarks.bench_cursor_filter
+    python -m benchmarks.bench_cursor_filter --replay recordings/session1 --latency-ms 50
+"""
+import argparse
+
+import numpy as np
+
+from core.cursor import CursorService
+from core.filters import ExponentialFilter, ConstantVelocityKalman, cursor_filter_from_calibration
+from core.recording import Recording
+from core.tracker import NOSE_TIP_INDEX
+from config import (
+    DEAD_ZONE, SMOOTHING_FACTOR, SENSITIVITY, CURSOR_FILTER_BETA, CURSOR_FILTER_D_CUTOFF,
+    CURSOR_PREDICTION_MAX_MS, CURSOR_PREDICTION_ACCEL_PX, CURSOR_PREDICTION_NOISE_PX,
+)
+
+SCREEN_SIZE = (1920, 1080)
+NUM_COLUMNS = 3
+REFERENCE_WINDOW_S = 0.15
+MAX_LAG_S = 0.5
+REST_SPEED_PX_S = 100
+
+
+def synthetic_path(fps, duration=20.0, noise=0.0015, seed=0):
+    """
+    Normalized nose positions that alternate between holds and sweeps,
+    plus landmark-sized noise
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(0, duration, 1 / fps)
+    phase = (timestamps % 4.0) / 4.0
+    # Hold for the first half of every 4 s cycle, then sweep out and back
+    sweep = np.where(phase < 0.5, 0.0, np.sin((phase - 0.5) * 2 * np.pi))
+    nose = np.stack([0.5 + 0.08 * sweep, 0.5 + 0.03 * sweep], axis=1)
+    nose += rng.normal(0.0, noise, nose.shape)
+    return timestamps, nose
+
+
+def recorded_path(path):
+    recording = Recording(path)
+    nose = np.asarray(recording.landmarks[:, NOSE_TIP_INDEX, :2], dtype=np.float64)
+    found = ~np.isnan(nose[:, 0])
+    return np.asarray(recording.timestamps, dtype=np.float64)[found], nose[found]
+
+
+def zero_phase_smooth(values, timestamps, window_s=REFERENCE_WINDOW_S):
+    """
+    Centered moving average, so the reference has no lag of its own
+    """
+    dt = np.median(np.diff(timestamps))
+    half = max(1, int(round(window_s / dt / 2)))
+    kernel = np.ones(2 * half + 1) / (2 * half + 1)
+    padded = np.pad(values, ((half, half), (0, 0)), mode="edge")
+    return np.stack([np.convolve(padded[:, i], kernel, mode="valid") for i in range(values.shape[1])], axis=1)
+
+
+def run_filter(cursor, timestamps, nose):
+    cursor.reset()
+    return np.array([cursor.update(n, t) for t, n in zip(timestamps, nose)], dtype=np.float64)
+
+
+def measure(filtered, targets, timestamps, latency):
+    dt = np.median(np.diff(timestamps))
+    reference = zero_phase_smooth(targets, timestamps)
+
+    # Negative shifts are included so a lag under one frame still has a
+    # minimum with neighbours on both sides to interpolate between
+    shifts = np.arange(-2, int(MAX_LAG_S / dt) + 1)
+    errors = []
+    for shift in shifts:
+        if shift >= 0:
+            diff = filtered[shift:] - reference[:len(reference) - shift]
+        else:
+            diff = filtered[:shift] - reference[-shift:]
+        errors.append(np.mean(np.sum(diff ** 2, axis=1)))
+    errors = np.asarray(errors)
+    best = int(np.argmin(errors))
+    # Parabolic fit around the best whole-frame shift for sub-frame lag
+    offset = 0.0
+    if 0 < best < len(errors) - 1:
+        curvature = errors[best - 1] - 2 * errors[best] + errors[best + 1]
+        if curvature > 0:
+            offset = 0.5 * (errors[best - 1] - errors[best + 1]) / curvature
+    lag_ms = (shifts[best] + offset) * dt * 1000
+
+    # Jitter only matters while the user holds still
+    speed = np.linalg.norm(np.gradient(reference, timestamps, axis=0), axis=1)
+    resting = speed < REST_SPEED_PX_S
+    if not resting.any():
+        resting[:] = True
+    residual = (filtered - zero_phase_smooth(filtered, timestamps))[resting]
+    jitter_px = float(np.sqrt(np.mean(np.sum(residual ** 2, axis=1))))
+
+    # Where the nose is by the time the frame is on screen
+    display_x = np.interp(timestamps + latency, timestamps, reference[:, 0])
+    column_width = SCREEN_SIZE[0] // NUM_COLUMNS
+    expected = np.clip(display_x, 0, SCREEN_SIZE[0] - 1) // column_width
+    column_miss = float(np.mean(filtered[:, 0] // column_width != expected)) * 100
+    return lag_ms, jitter_px, column_miss
+
+
+def make_cursor(cursor_filter, predictor=None, latency=0.0):
+    cursor = CursorService(
+        SCREEN_SIZE[0], SCREEN_SIZE[1], DEAD_ZONE, SENSITIVITY, cursor_filter,
+        predictor=predictor, max_horizon=CURSOR_PREDICTION_MAX_MS / 1000,
+    )
+    cursor.observe_latency(latency)
+    return cursor
+
+
+def compare(name, timestamps, nose, latency):
+    cursors = {
+        "exponential": make_cursor(ExponentialFilter(SMOOTHING_FACTOR)),
+        "one_euro": make_cursor(cursor_filter_from_calibration(SMOOTHING_FACTOR, CURSOR_FILTER_BETA, CURSOR_FILTER_D_CUTOFF)),
+        "one_euro+kalman": make_cursor(
+            cursor_filter_from_calibration(SMOOTHING_FACTOR, CURSOR_FILTER_BETA, CURSOR_FILTER_D_CUTOFF),
+            ConstantVelocityKalman(CURSOR_PREDICTION_ACCEL_PX, CURSOR_PREDICTION_NOISE_PX),
+            latency,
+        ),
+    }
+    targets = np.array([cursors["one_euro"].target(n) for n in nose], dtype=np.float64)
+
+    print(f"{name}: {len(timestamps)} frames")
+    results = {}
+    for filter_name, cursor in cursors.items():
+        lag_ms, jitter_px, column_miss = measure(run_filter(cursor, timestamps, nose), targets, timestamps, latency)
+        results[filter_name] = (lag_ms, jitter_px, column_miss)
+        print(f"   {filter_name:<16} lag {lag_ms:6.1f} ms   jitter {jitter_px:6.2f} px   column miss {column_miss:5.1f} %")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--replay", metavar="DIR", help="recording to use instead of synthetic input")
+    parser.add_argument("--fps", type=float, nargs="+", default=[15, 30, 60], help="frame rates for synthetic input")
+    parser.add_argument("--latency-ms", type=float, default=50, help="capture-to-display latency to predict over")
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    print(f"Calibration: smoothing {SMOOTHING_FACTOR:.3f}, beta {CURSOR_FILTER_BETA}")
+    if args.replay:
+        timestamps, nose = recorded_path(args.replay)
+        compare(args.replay, timestamps, nose, latency)
+    else:
+        for fps in args.fps:
+            timestamps, nose = synthetic_path(fps)
+            compare(f"synthetic @ {fps:g} FPS", timestamps, nose, latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Microbenchmark for GazeEstimator's landmark feature path.
+
+Compares the original per-call implementation (index lists rebuilt, list
+comprehension over every landmark, one np.linalg.norm per EAR segment)
+against the vectorized path on synthetic landmarks.
+
+    python -m benchmarks.bench_gaze_features
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from core.gaze_estimator import (
+    GazeEstimator,
+    LEFT_EYE_INDICES,
+    RIGHT_EYE_INDICES,
+    MUTUAL_INDICES,
+    NUM_LANDMARKS,
+)
+
+
+class SyntheticLandmark:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+def make_landmarks(seed=0):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0.2, 0.8, size=(NUM_LANDMARKS, 3))
+    return [SyntheticLandmark(float(x), float(y), float(z)) for x, y, z in points]
+
+
+def legacy_features(landmarks):
+    """
+    The feature path as it was before vectorization
+    """
+    left_eye_indices = list(LEFT_EYE_INDICES)
+    right_eye_indices = list(RIGHT_EYE_INDICES)
+    mutual_indices = list(MUTUAL_INDICES)
+
+    all_points = np.array(
+        [(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32
+    )
+    anchor = all_points[4]
+    all_points_centered = all_points - anchor
+
+    left_corner = all_points[33]
+    right_corner = all_points[263]
+    inter_eye_dist = np.linalg.norm(right_corner - left_corner)
+    if inter_eye_dist > 1e-7:
+        all_points_centered /= inter_eye_dist
+
+    subset_indices = left_eye_indices + right_eye_indices + mutual_indices
+    eye_landmarks = all_points_centered[subset_indices]
+    features = eye_landmarks.flatten()
+
+    left_eye_inner = np.array([landmarks[133].x, landmarks[133].y])
+    left_eye_outer = np.array([landmarks[33].x, landmarks[33].y])
+    left_eye_top = np.array([landmarks[159].x, landmarks[159].y])
+    left_eye_bottom = np.array([landmarks[145].x, landmarks[145].y])
+
+    right_eye_inner = np.array([landmarks[362].x, landmarks[362].y])
+    right_eye_outer = np.array([landmarks[263].x, landmarks[263].y])
+    right_eye_top = np.array([landmarks[386].x, landmarks[386].y])
+    right_eye_bottom = np.array([landmarks[374].x, landmarks[374].y])
+
+    left_eye_width = np.linalg.norm(left_eye_outer - left_eye_inner)
+    left_eye_height = np.linalg.norm(left_eye_top - left_eye_bottom)
+    left_EAR = left_eye_height / (left_eye_width + 1e-8)
+
+    right_eye_width = np.linalg.norm(right_eye_outer - right_eye_inner)
+    right_eye_height = np.linalg.norm(right_eye_top - right_eye_bottom)
+    right_EAR = right_eye_height / (right_eye_width + 1e-8)
+
+    return features, (left_EAR + right_EAR) / 2
+
+
+def time_per_call(func, number):
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    landmarks = make_landmarks()
+    estimator = GazeEstimator()
+    points = estimator.landmarks_to_points(landmarks).copy()
+
+    legacy, legacy_ear = legacy_features(landmarks)
+    fast, fast_ear = estimator.features_from_landmarks(landmarks)
+    assert np.allclose(legacy, fast, atol=1e-5), "feature vectors differ"
+    assert abs(legacy_ear - fast_ear) < 1e-5, "EAR differs"
+
+    results = {
+        "legacy features_from_landmarks": time_per_call(lambda: legacy_features(landmarks), args.number),
+        "vectorized features_from_landmarks": time_per_call(lambda: estimator.features_from_landmarks(landmarks), args.number),
+        "vectorized features_from_points": time_per_call(lambda: estimator.features_from_points(points), args.number),
+    }
+
+    baseline = results["legacy features_from_landmarks"]
+    for name, usec in results.items():
+        print(f"{name:<38} {usec:8.1f} us/call  ({baseline / usec:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
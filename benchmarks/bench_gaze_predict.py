@@ -0,0 +1,80 @@
+"""
+Microbenchmark for GazeEstimator inference and online updates.
+
+Compares the sklearn path (StandardScaler.transform, variable scaling,
+Ridge.predict) against the folded X @ W + b predict for one sample, and a
+recursive least squares update against refitting from scratch on all
+samples collected so far.
+
+    python -m benchmarks.bench_gaze_predict
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from core.gaze_estimator import GazeEstimator
+
+
+def sklearn_predict(estimator, X):
+    """
+    The predict path as it was before the weights were folded
+    """
+    X_scaled = estimator.scaler.transform(X)
+    if estimator.variable_scaling is not None:
+        X_scaled *= estimator.variable_scaling
+    return estimator.model.predict(X_scaled)
+
+
+def time_per_call(func, number):
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=200, help="calibration samples to train on")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    estimator = GazeEstimator()
+    num_features = len(estimator.subset_indices) * 3
+    X = rng.normal(size=(args.samples + 1, num_features)).astype(np.float32)
+    y = rng.uniform(0, 1920, size=(args.samples + 1, 2))
+    variable_scaling = rng.uniform(0.5, 2.0, size=num_features)
+
+    estimator.train(X[:-1], y[:-1], variable_scaling=variable_scaling)
+    sample = X[:1]
+    error = np.abs(estimator.predict(sample) - sklearn_predict(estimator, sample)).max()
+    assert error < 1e-2, f"folded predict differs by {error} px"
+
+    # One extra sample through RLS must land where a refit on all of them does
+    updated = GazeEstimator()
+    updated.train(X[:-1], y[:-1], variable_scaling=variable_scaling)
+    updated.update(X[-1], y[-1])
+    refit = GazeEstimator()
+    refit.train(X, y, variable_scaling=variable_scaling)
+    update_error = np.abs(updated.predict(X) - refit.predict(X)).max()
+
+    results = {
+        "sklearn predict": time_per_call(lambda: sklearn_predict(estimator, sample), args.number),
+        "folded predict": time_per_call(lambda: estimator.predict(sample), args.number),
+        "folded predict (1-D sample)": time_per_call(lambda: estimator.predict(sample[0]), args.number),
+    }
+    baseline = results["sklearn predict"]
+    for name, usec in results.items():
+        print(f"{name:<38} {usec:8.1f} us/call  ({baseline / usec:6.1f}x)")
+    print(f"   max folded vs sklearn difference {error:.2e} px")
+
+    update_number = max(1, args.number // 20)
+    refit_us = time_per_call(lambda: refit.train(X, y, variable_scaling=variable_scaling), max(1, update_number // 10))
+    update_us = time_per_call(lambda: updated.update(X[-1], y[-1]), update_number)
+    print(f"{'refit on ' + str(len(X)) + ' samples':<38} {refit_us:8.1f} us/call")
+    print(f"{'rls update':<38} {update_us:8.1f} us/call  ({refit_us / update_us:6.1f}x)")
+    # The refit re-estimates the scaler, RLS keeps the trained one
+    print(f"   max rls vs refit difference {update_error:.2f} px")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Headless per-stage latency benchmark for the frame pipeline.
+
+Runs the capture -> flip -> face tracking -> cursor -> game update ->
+render -> display stages on synthetic input or a recording (see
+core/recording.py), and reports p50/p95/p99 per stage plus overall FPS.
+Tracking goes through the app's FaceTracker with its configured ROI
+cropping, optical flow and downscaling, so those paths are what is timed;
+the frames the mesh and the flow served are counted separately. Synthetic
+noise frames hold no face for FaceMesh to find, so use a recording with
+frames to measure them.
+
+Also runs microbenchmarks for GazeEstimator.train/predict, optical flow
+tracking between FaceMesh runs, mixing one audio block, pitch-shifting a
+sample, opening and querying a long chart, and the rhythm note update loop.
+
+    python -m benchmarks.bench_pipeline --frames 300 --output results.json
+    python -m benchmarks.bench_pipeline --replay recordings/session1 \\
+        --baseline baseline.json --thresholds benchmarks/thresholds.json
+
+With --baseline the run exits non-zero when a stage's p95 regresses past
+its configured threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from core.audio import AudioEngine, Voice
+from core.blink import BlinkDetector
+from core.capture import CapturedFrame
+from core.chart import Chart, compile_chart
+from core.cursor import CursorService
+from core.display import create_display, DISPLAY_BACKENDS
+from core.filters import cursor_filter_from_calibration, ConstantVelocityKalman
+from core.gaze_estimator import GazeEstimator, NUM_LANDMARKS
+from core.landmark_flow import LandmarkFlow
+from core.recording import ReplaySource
+from core.sound_bank import load_piano_samples, SampleBank, pitch_shift
+from core.tracker import FaceTracker
+from config import (
+    DEAD_ZONE, SMOOTHING_FACTOR, SENSITIVITY, CURSOR_FILTER_BETA, CURSOR_FILTER_D_CUTOFF,
+    TRACKING_USE_ROI, TRACKING_FRAME_BUDGET_MS,
+    TRACKING_FLOW_INTERVAL, TRACKING_FLOW_MAX_MOTION_PX, TRACKING_FLOW_MIN_QUALITY,
+    BLINK_CLOSE_EAR, BLINK_OPEN_EAR, BLINK_MIN_CLOSED_MS, BLINK_FIRE_ON,
+    CURSOR_PREDICTION, CURSOR_PREDICTION_MAX_MS, CURSOR_PREDICTION_ACCEL_PX, CURSOR_PREDICTION_NOISE_PX,
+    AUDIO_BLOCK_SIZE, AUDIO_MAX_VOICES,
+)
+
+STAGES = [
+    "capture",
+    "flip",
+    "tracking",
+    "cursor_smoothing",
+    "game_update",
+    "render",
+    "display",
+]
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+
+class SyntheticSource:
+    """
+    Camera stand-in producing noise frames and a face-shaped landmark cloud
+    drifting around the frame, as fast as it is read
+    """
+
+    landmarks_only = False
+
+    def __init__(self, count, width=640, height=480, seed=0):
+        rng = np.random.default_rng(seed)
+        self.count = count
+        self.frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+        self.face = rng.normal(0.0, 0.06, (NUM_LANDMARKS, 3)).astype(np.float32)
+        self.sequence = 0
+
+    def is_opened(self):
+        return self.sequence < self.count
+
+    def read(self, timeout=1.0):
+        if self.sequence >= self.count:
+            return None
+        t = self.sequence / 30.0
+        points = self.face.copy()
+        points[:, 0] += 0.5 + 0.1 * np.sin(t)
+        points[:, 1] += 0.5 + 0.05 * np.cos(1.3 * t)
+        captured = CapturedFrame(self.frames[self.sequence % len(self.frames)], time.perf_counter(), self.sequence, points)
+        self.sequence += 1
+        return captured
+
+    def release(self):
+        pass
+
+
+def make_tracker(landmarks_only):
+    """
+    The app's FaceTracker with the configured ROI, flow and frame budget.
+    Without FaceMesh on this machine it only takes landmarks handed to it
+    """
+    options = dict(
+        blink_detector=BlinkDetector(BLINK_CLOSE_EAR, BLINK_OPEN_EAR, BLINK_MIN_CLOSED_MS, BLINK_FIRE_ON),
+        use_roi=TRACKING_USE_ROI,
+        frame_budget_ms=TRACKING_FRAME_BUDGET_MS,
+        flow_interval=TRACKING_FLOW_INTERVAL,
+        flow_max_motion_px=TRACKING_FLOW_MAX_MOTION_PX,
+        flow_min_quality=TRACKING_FLOW_MIN_QUALITY,
+    )
+    if not landmarks_only:
+        try:
+            return FaceTracker(**options)
+        except (ImportError, AttributeError) as e:
+            print(f"⚠️ FaceMesh unavailable, tracking the source's landmarks instead: {e}")
+    return FaceTracker(build_mesh=False, **options)
+
+
+class BenchApp:
+    """
+    Minimal stand-in for core.app.App giving scenes what they read from it
+    """
+
+    # Frames come from the benchmark, not a camera or replay of the app's
+    camera = None
+
+    def __init__(self, audio, screen_size=(1920, 1080)):
+        self.audio = audio
+        self.cursor = make_cursor(screen_size)
+
+
+def load_rhythm_scene():
+    """
+    The real RhythmScene, or None when the screen modules cannot be
+    imported on this machine (they need pyautogui and a display)
+    """
+    try:
+        from rhythm_game import RhythmScene
+    except Exception as e:
+        print(f"⚠️ Rhythm scene unavailable, game_update/render stages skipped: {e}")
+        return None
+
+    # Never started, so hits are timed without opening an audio device
+    samples, sample_rate = load_piano_samples()
+    audio = AudioEngine(SampleBank(samples, sample_rate))
+    try:
+        scene = RhythmScene(BenchApp(audio))
+    except Exception:
+        audio.close()
+        raise
+    if scene.chart is None:
+        audio.close()
+        return None
+    scene.enter()
+    return scene
+
+
+def make_cursor(screen_size):
+    """
+    The app's cursor service with the calibrated filter and predictor and
+    no OS sync
+    """
+    cursor_filter = cursor_filter_from_calibration(SMOOTHING_FACTOR, CURSOR_FILTER_BETA, CURSOR_FILTER_D_CUTOFF)
+    predictor = ConstantVelocityKalman(CURSOR_PREDICTION_ACCEL_PX, CURSOR_PREDICTION_NOISE_PX) if CURSOR_PREDICTION else None
+    return CursorService(
+        screen_size[0], screen_size[1], DEAD_ZONE, SENSITIVITY, cursor_filter,
+        predictor=predictor, max_horizon=CURSOR_PREDICTION_MAX_MS / 1000,
+    )
+
+
+def run_pipeline(source, frames, display=None, screen_size=(1920, 1080)):
+    timings = {stage: [] for stage in STAGES}
+    tracker = make_tracker(source.landmarks_only)
+    scene = load_rhythm_scene()
+    cursor = make_cursor(screen_size)
+
+    processed = 0
+    wall_start = time.perf_counter()
+    try:
+        while processed < frames and source.is_opened():
+            t0 = time.perf_counter()
+            captured = source.read()
+            t1 = time.perf_counter()
+            if captured is None:
+                break
+            timings["capture"].append(t1 - t0)
+
+            if tracker.face_mesh is not None:
+                frame = cv2.flip(captured.frame, 1)
+                t2 = time.perf_counter()
+                timings["flip"].append(t2 - t1)
+                tracking = tracker.process(frame, captured.timestamp)
+            else:
+                t2 = time.perf_counter()
+                tracking = tracker.process_points(captured.points, captured.timestamp)
+            t3 = time.perf_counter()
+            timings["tracking"].append(t3 - t2)
+
+            if tracking.face_found:
+                cursor.update(tracking.nose, captured.timestamp)
+                timings["cursor_smoothing"].append(time.perf_counter() - t3)
+
+            if scene is not None:
+                t5 = time.perf_counter()
+                scene.update(tracking, captured.timestamp)
+                t6 = time.perf_counter()
+                canvas = scene.render()
+                t7 = time.perf_counter()
+                timings["game_update"].append(t6 - t5)
+                timings["render"].append(t7 - t6)
+
+                if display is not None:
+                    display.present(canvas, scene.damage())
+                    display.poll_events()
+                    timings["display"].append(time.perf_counter() - t7)
+
+            processed += 1
+
+        wall = time.perf_counter() - wall_start
+        tracker_stats = {
+            "mesh_frames": tracker.mesh_frames,
+            "flow_frames": tracker.flow_frames,
+            "scale": tracker.scale,
+        }
+    finally:
+        tracker.close()
+        if scene is not None:
+            scene.app.audio.close()
+    return timings, processed, wall, tracker_stats
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    ms = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def time_calls(func, repeat):
+    # Untimed first call so lazy imports and caches are not counted
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def run_microbenchmarks(repeat=200, seed=0):
+    rng = np.random.default_rng(seed)
+    estimator = GazeEstimator()
+    num_features = len(estimator.subset_indices) * 3
+    X = rng.normal(size=(200, num_features)).astype(np.float32)
+    y = rng.uniform(0, 1920, size=(200, 2))
+
+    results = {
+        "gaze_train": time_calls(lambda: estimator.train(X, y), max(1, repeat // 20)),
+        "gaze_predict": time_calls(lambda: estimator.predict(X[:1]), repeat),
+    }
+
+    # What a frame between FaceMesh runs costs: a textured frame moved by a
+    # few pixels, with a face-sized landmark cloud
+    frame = cv2.GaussianBlur(rng.integers(0, 255, (480, 640), dtype=np.uint8), (0, 0), 2)
+    moved = np.roll(frame, (2, 3), axis=(0, 1))
+    face = (0.5 + rng.normal(0.0, 0.06, (NUM_LANDMARKS, 3))).astype(np.float32)
+    flow = LandmarkFlow()
+
+    def track_landmarks():
+        flow.reset(frame, face)
+        flow.track(moved, face.copy())
+
+    results["landmark_flow_track"] = time_calls(track_landmarks, repeat)
+
+    # One output block with the voice limit reached, half of them fading
+    samples, sample_rate = load_piano_samples()
+    if samples:
+        engine = AudioEngine(SampleBank(samples, sample_rate), block_size=AUDIO_BLOCK_SIZE, max_voices=AUDIO_MAX_VOICES)
+        try:
+            block = np.zeros((AUDIO_BLOCK_SIZE, engine.channels), dtype=np.float32)
+            notes = list(samples)
+
+            def mix_full_block():
+                engine.voices = [Voice(samples[notes[i % len(notes)]], 0.5, sample_rate if i % 2 else None) for i in range(AUDIO_MAX_VOICES)]
+                engine.mix(block)
+
+            results[f"audio_mix_{AUDIO_MAX_VOICES}_voices"] = time_calls(mix_full_block, repeat)
+            # What a cache miss costs: the longest sample one octave down and up
+            longest = max(samples.values(), key=len)
+            results["pitch_shift_octave_down"] = time_calls(lambda: pitch_shift(longest, 0.5), max(1, repeat // 10))
+            results["pitch_shift_octave_up"] = time_calls(lambda: pitch_shift(longest, 2.0), max(1, repeat // 10))
+        finally:
+            engine.close()
+
+    # An hour-long chart at 8 notes a second
+    with tempfile.TemporaryDirectory() as chart_dir:
+        source = os.path.join(chart_dir, "long.json")
+        compiled = os.path.join(chart_dir, "long.nhc")
+        positions = np.arange(3600 * 8) / 8.0
+        with open(source, "w") as f:
+            json.dump({"notes": [[t, i % 3] for i, t in enumerate(positions.tolist())]}, f)
+        compile_chart(source, compiled)
+
+        results["chart_open_28800"] = time_calls(lambda: Chart(compiled), max(1, repeat // 10))
+        chart = Chart(compiled)
+        starts = iter(rng.uniform(0, chart.duration, size=repeat + 1))
+
+        def query_window():
+            start = next(starts)
+            chart.between(start, start + 5.0)
+
+        results["chart_query_28800"] = time_calls(query_window, repeat)
+        # Release the memory maps before the directory is removed
+        chart = None
+
+    scene = load_rhythm_scene()
+    if scene is not None:
+        try:
+            # 300 notes spread over the screen height, all on screen at the
+            # scene's current time
+            dense_columns = np.arange(300) % 3
+            dense_offsets = np.linspace(-0.95 * scene.notes.cull_y / scene.notes.speed, 0.0, 300)
+
+            def fill_dense_notes():
+                now = scene.app.audio.time()
+                scene.notes.clear()
+                scene.notes.spawn_many(dense_columns, now + dense_offsets)
+                # Past the end of the chart, so update_notes spawns nothing
+                scene.song_start_time = now
+                scene.next_note = len(scene.chart)
+                scene.now = now
+                return now
+
+            def update_dense_notes():
+                now = fill_dense_notes()
+                scene.update_notes(now)
+                scene.notes.try_hit(1, now)
+
+            results["rhythm_update_notes_300"] = time_calls(update_dense_notes, repeat)
+            fill_dense_notes()
+            results["rhythm_render_300"] = time_calls(scene.render, repeat)
+        finally:
+            scene.app.audio.close()
+    return results
+
+
+def check_regressions(results, baseline, thresholds):
+    """
+    Returns a list of (name, baseline_p95, current_p95, limit) for every
+    stage or microbenchmark whose p95 grew past its threshold
+    """
+    default = thresholds.get("default", 0.25)
+    per_name = thresholds.get("stages", {})
+    regressions = []
+    for section in ("stages", "micro"):
+        for name, current in results[section].items():
+            previous = baseline.get(section, {}).get(name)
+            if not current or not previous:
+                continue
+            limit = previous["p95_ms"] * (1 + per_name.get(name, default))
+            if current["p95_ms"] > limit:
+                regressions.append((name, previous["p95_ms"], current["p95_ms"], limit))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--replay", metavar="DIR", help="recording to use instead of synthetic input")
+    parser.add_argument("--display", choices=sorted(DISPLAY_BACKENDS), help="present frames with this backend in the display stage")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--output", metavar="JSON", help="write results here")
+    parser.add_argument("--baseline", metavar="JSON", help="results of an earlier run to compare against")
+    parser.add_argument("--thresholds", metavar="JSON", default=DEFAULT_THRESHOLDS)
+    args = parser.parse_args()
+
+    if args.replay:
+        source = ReplaySource(args.replay, realtime=False)
+        input_name = args.replay
+    else:
+        source = SyntheticSource(args.frames)
+        input_name = "synthetic"
+
+    display = None
+    if args.display:
+        display = create_display(args.display, "NoseHero benchmark", 1920, 1080)
+        display.open()
+    try:
+        timings, processed, wall, tracker_stats = run_pipeline(source, args.frames, display=display)
+    finally:
+        if display is not None:
+            display.close()
+    results = {
+        "input": input_name,
+        "frames": processed,
+        "fps": processed / wall if wall > 0 else 0.0,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "tracker": tracker_stats,
+        "stages": {stage: summarize(samples) for stage, samples in timings.items()},
+        "micro": {} if args.skip_micro else run_microbenchmarks(),
+    }
+
+    print(f"{processed} frames from {input_name}: {results['fps']:.1f} FPS")
+    print(f"   FaceMesh on {tracker_stats['mesh_frames']}, optical flow on {tracker_stats['flow_frames']}, input scale {tracker_stats['scale']:.2f}")
+    for section in ("stages", "micro"):
+        for name, summary in results[section].items():
+            if summary is None:
+                print(f"   {name:<26} skipped")
+            else:
+                print(f"   {name:<26} p50 {summary['p50_ms']:8.3f} ms  p95 {summary['p95_ms']:8.3f} ms  p99 {summary['p99_ms']:8.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        thresholds = {}
+        if args.thresholds and os.path.exists(args.thresholds):
+            with open(args.thresholds, "r") as f:
+                thresholds = json.load(f)
+        regressions = check_regressions(results, baseline, thresholds)
+        for name, previous, current, limit in regressions:
+            print(f"❌ {name} regressed: p95 {previous:.3f} ms -> {current:.3f} ms (limit {limit:.3f} ms)")
+        if regressions:
+            sys.exit(1)
+        print("✅ No stage regressed past its threshold")
+
+
+if __name__ == "__main__":
+    main()
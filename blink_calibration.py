@@ -0,0 +1,96 @@
+# First, so the startup report counts the imports below
+from core.app import Scene, run_app
+import cv2
+import numpy as np
+import pyautogui
+from core.blink import thresholds_from_samples
+from core.render import LayerCache, Compositor
+from config import save_calibration_settings
+
+screen_width, screen_height = pyautogui.size()
+
+UI_MARGIN = 60
+# Seconds per phase; samples from the first SETTLE_TIME of each phase are
+# dropped while the user reacts to the prompt
+PHASE_DURATION = 3.0
+SETTLE_TIME = 0.7
+RESULT_DURATION = 3.0
+
+# Prompt shown and note played when each phase starts. The tone is the cue
+# for the eyes-closed phase, since the screen can't be read then
+phases = [
+    ("open", "Keep your eyes open and look at the screen", 'C'),
+    ("closed", "Close your eyes until you hear the next tone", 'E'),
+    ("result", None, 'G'),
+]
+
+def draw_calibration_background(canvas, prompt):
+    cv2.putText(canvas, "Blink Setup", (screen_width//2 - 150, UI_MARGIN), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 2)
+    cv2.putText(canvas, prompt, (UI_MARGIN, screen_height//2), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
+
+
+class BlinkCalibrationScene(Scene):
+    """
+    Records the user's eye aspect ratio with eyes open and then closed, and
+    derives and saves the blink thresholds from the two distributions
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.layers = LayerCache(screen_width, screen_height, draw_calibration_background)
+        self.compositor = Compositor(screen_width, screen_height)
+
+    def enter(self):
+        self.samples = {"open": [], "closed": []}
+        self.phase_index = -1
+        self.phase_start = None
+        self.result_text = ""
+
+    def start_phase(self, index, timestamp):
+        self.phase_index = index
+        self.phase_start = timestamp
+        name, _, note = phases[index]
+        self.app.audio.play(note)
+        if name == "result":
+            self.finish()
+
+    def finish(self):
+        thresholds = thresholds_from_samples(np.array(self.samples["open"]), np.array(self.samples["closed"]))
+        if thresholds is None:
+            print("⚠️ Open and closed eye readings are too close, keeping the current blink thresholds")
+            self.result_text = "Could not tell open from closed eyes, try again"
+            return
+
+        close_ear, open_ear = thresholds
+        self.app.set_blink_thresholds(close_ear, open_ear)
+        save_calibration_settings(blink_close_ear=close_ear, blink_open_ear=open_ear)
+        self.result_text = f"Saved: closed below {close_ear:.3f}, open above {open_ear:.3f}"
+
+    def update(self, tracking, timestamp):
+        if self.phase_start is None:
+            self.start_phase(0, timestamp)
+            return None
+
+        name = phases[self.phase_index][0]
+        elapsed = timestamp - self.phase_start
+        if name == "result":
+            return "menu" if elapsed >= RESULT_DURATION else None
+
+        if tracking.face_found and elapsed >= SETTLE_TIME:
+            self.samples[name].append(tracking.ear)
+        if elapsed >= PHASE_DURATION:
+            self.start_phase(self.phase_index + 1, timestamp)
+        return None
+
+    def render(self):
+        prompt = phases[self.phase_index][1] or self.result_text
+        canvas = self.compositor.begin(self.layers.get(prompt))
+
+        if self.phase_start is not None and phases[self.phase_index][0] != "result":
+            count = len(self.samples[phases[self.phase_index][0]])
+            self.compositor.text(f"{count} samples", (UI_MARGIN, screen_height//2 + 60), 1, (180, 180, 180), 2)
+        return canvas
+
+
+if __name__ == "__main__":
+    run_app("blink_calibration")
@@ -6,6 +6,8 @@ CALIBRATION_FILE = "calibration_settings.json"
 DEFAULT_DEAD_ZONE = 0.02
 DEFAULT_SMOOTHING = 0.8
 DEFAULT_SENSITIVITY = 3.5
+DEFAULT_BLINK_CLOSE_EAR = 0.2
+DEFAULT_BLINK_OPEN_EAR = 0.24
 
 def load_calibration_settings():
     try:
@@ -21,4 +23,99 @@ def load_calibration_settings():
         print("⚠️ No calibration file found! Using default settings.")
         return DEFAULT_DEAD_ZONE, DEFAULT_SMOOTHING, DEFAULT_SENSITIVITY
 
+def load_blink_calibration():
+    try:
+        with open(CALIBRATION_FILE, "r") as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        settings = {}
+    return (
+        settings.get("blink_close_ear", DEFAULT_BLINK_CLOSE_EAR),
+        settings.get("blink_open_ear", DEFAULT_BLINK_OPEN_EAR)
+    )
+
+def save_calibration_settings(**updates):
+    """
+    Merges the given keys into the calibration file, keeping the rest
+    """
+    try:
+        with open(CALIBRATION_FILE, "r") as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        settings = {}
+    settings.update(updates)
+    with open(CALIBRATION_FILE, "w") as f:
+        json.dump(settings, f)
+    print("💾 Saved Calibration Settings:", updates)
+
 DEAD_ZONE, SMOOTHING_FACTOR, SENSITIVITY = load_calibration_settings()
+BLINK_CLOSE_EAR, BLINK_OPEN_EAR = load_blink_calibration()
+
+# Face tracking: crop inference to the face found in the previous frame.
+# With a budget in milliseconds the mesh input is downscaled while inference
+# runs over it, as long as that measurably helps; FaceMesh resizes its input
+# itself, so this stays off (None) until the saving is measured
+TRACKING_USE_ROI = True
+TRACKING_FRAME_BUDGET_MS = None
+# Between FaceMesh runs, follow the nose tip, eye contours and irises with
+# optical flow. The mesh runs every TRACKING_FLOW_INTERVAL frames (1 turns
+# flow off), and sooner when the face moves more than
+# TRACKING_FLOW_MAX_MOTION_PX in a frame, fewer than
+# TRACKING_FLOW_MIN_QUALITY of the points track cleanly or a blink may be
+# starting
+TRACKING_FLOW_INTERVAL = 4
+TRACKING_FLOW_MAX_MOTION_PX = 12
+TRACKING_FLOW_MIN_QUALITY = 0.8
+# Run the camera and face inference in a separate process (also --worker)
+TRACKING_WORKER = False
+
+# How frames reach the screen (also --display): "pygame" only sends the
+# rects that changed, "opencv" uploads every frame whole with cv2.imshow,
+# "null" shows nothing
+DISPLAY_BACKEND = "pygame"
+
+# Cursor filter: a One Euro filter resting at the cutoff equivalent to the
+# calibrated smoothing; beta (per px/s) opens it up while the nose moves
+CURSOR_FILTER_BETA = 0.007
+CURSOR_FILTER_D_CUTOFF = 1.0
+
+# Cursor prediction: extrapolate along a constant-velocity Kalman estimate
+# by the measured capture-to-display latency, never further ahead than
+# CURSOR_PREDICTION_MAX_MS. Noise terms are in screen pixels
+CURSOR_PREDICTION = True
+CURSOR_PREDICTION_MAX_MS = 60
+CURSOR_PREDICTION_ACCEL_PX = 2000
+CURSOR_PREDICTION_NOISE_PX = 12
+
+# Blink clicks: a closure has to be held this long, and then fires right
+# away ("close") or once the eyes reopen ("release")
+BLINK_MIN_CLOSED_MS = 80
+BLINK_FIRE_ON = "close"
+
+# Cursor source: "nose", "gaze" (needs a trained gaze model) or "fused",
+# which blends them with this much weight on gaze. Gaze calibration samples
+# and the model trained on them are kept in these files
+CURSOR_MODE = "nose"
+GAZE_FUSION_WEIGHT = 0.5
+GAZE_CALIBRATION_DIR = "calibration_data"
+GAZE_MODEL_FILE = "gaze_model.bin"
+
+# Scenes hit-test against an in-process cursor. Set OS_CURSOR_SYNC to also
+# move the system pointer, from a background thread at this rate
+OS_CURSOR_SYNC = False
+OS_CURSOR_SYNC_HZ = 30
+
+# Audio output: frames mixed per callback (smaller is lower latency but
+# risks underruns) and how many notes may ring at once before the oldest
+# are faded out
+AUDIO_BLOCK_SIZE = 256
+AUDIO_MAX_VOICES = 16
+
+# Notes outside the recorded octave are pitch-shifted from it; shifted
+# samples are kept in memory up to this many bytes. Each octave down doubles
+# a sample's length, so all twelve notes take about 6 MB one octave down and
+# 24 MB three down
+SAMPLE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Rhythm game song: a JSON chart, compiled to a binary timeline on first use
+RHYTHM_CHART = "charts/sample.json"
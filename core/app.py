@@ -0,0 +1,393 @@
+from core.startup import StartupTimer, Preloader
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+import pyautogui
+
+from core.blink import BlinkDetector
+from core.capture import CameraCapture
+from core.inference_worker import InferenceWorker
+from core.display import create_display, DISPLAY_BACKENDS, CLOSE
+from core.cursor import CursorService, CURSOR_MODES, NOSE, set_os_cursor_hidden
+from core.filters import cursor_filter_from_calibration, ConstantVelocityKalman
+from core.recording import SessionRecorder, ReplaySource
+from core.tracing import TRACER
+from config import (
+    DEAD_ZONE, SMOOTHING_FACTOR, SENSITIVITY,
+    TRACKING_USE_ROI, TRACKING_FRAME_BUDGET_MS, TRACKING_WORKER,
+    TRACKING_FLOW_INTERVAL, TRACKING_FLOW_MAX_MOTION_PX, TRACKING_FLOW_MIN_QUALITY,
+    BLINK_CLOSE_EAR, BLINK_OPEN_EAR, BLINK_MIN_CLOSED_MS, BLINK_FIRE_ON,
+    CURSOR_FILTER_BETA, CURSOR_FILTER_D_CUTOFF,
+    CURSOR_PREDICTION, CURSOR_PREDICTION_MAX_MS, CURSOR_PREDICTION_ACCEL_PX, CURSOR_PREDICTION_NOISE_PX,
+    OS_CURSOR_SYNC, OS_CURSOR_SYNC_HZ,
+    CURSOR_MODE, GAZE_FUSION_WEIGHT, GAZE_MODEL_FILE,
+    AUDIO_BLOCK_SIZE, AUDIO_MAX_VOICES, SAMPLE_CACHE_BYTES,
+    DISPLAY_BACKEND,
+)
+
+WINDOW_NAME = "NoseHero"
+QUIT = "quit"
+# Events from the display that end the session
+QUIT_EVENTS = ("q", CLOSE)
+
+
+class Scene:
+    """
+    One screen of the app. The App keeps a single instance of each scene
+    alive and calls enter() every time it becomes active, update() and
+    render() once per frame, and exit() when switching away.
+
+    update() returns the name of the scene to switch to, QUIT, or None to
+    stay on this scene.
+    """
+
+    hide_os_cursor = True
+
+    def __init__(self, app):
+        self.app = app
+
+    def enter(self):
+        pass
+
+    def update(self, tracking, timestamp):
+        return None
+
+    def render(self):
+        raise NotImplementedError
+
+    def damage(self):
+        """
+        Rects of the last rendered frame that changed since the one before,
+        or None for the whole frame
+        """
+        compositor = getattr(self, "compositor", None)
+        return compositor.damage() if compositor is not None else None
+
+    def exit(self):
+        pass
+
+
+def default_scenes():
+    # Imported here because the screen modules import this one
+    from main_menu import MenuScene
+    from sandbox import SandboxScene
+    from rhythm_game import RhythmScene
+    from blink_calibration import BlinkCalibrationScene
+    from gaze_calibration import GazeCalibrationScene, GazeRecalibrationScene
+
+    return {
+        "menu": MenuScene,
+        "sandbox": SandboxScene,
+        "rhythm": RhythmScene,
+        "blink_calibration": BlinkCalibrationScene,
+        "gaze_calibration": GazeCalibrationScene,
+        "gaze_recalibration": GazeRecalibrationScene,
+    }
+
+
+def tracker_options():
+    """
+    FaceTracker keyword arguments from config.py, shared by the in-process
+    tracker and the inference worker's
+    """
+    return dict(
+        blink_detector=BlinkDetector(BLINK_CLOSE_EAR, BLINK_OPEN_EAR, BLINK_MIN_CLOSED_MS, BLINK_FIRE_ON),
+        use_roi=TRACKING_USE_ROI,
+        frame_budget_ms=TRACKING_FRAME_BUDGET_MS,
+        flow_interval=TRACKING_FLOW_INTERVAL,
+        flow_max_motion_px=TRACKING_FLOW_MAX_MOTION_PX,
+        flow_min_quality=TRACKING_FLOW_MIN_QUALITY,
+    )
+
+
+def load_tracker(build_mesh=True):
+    # mediapipe is imported on the preload thread
+    from core.tracker import FaceTracker
+
+    return FaceTracker(build_mesh=build_mesh, **tracker_options())
+
+
+def load_camera(camera_source, use_worker):
+    if use_worker:
+        return InferenceWorker(camera_source, tracker_options=tracker_options())
+    return CameraCapture(camera_source)
+
+
+def load_gaze_model():
+    """
+    The gaze model saved by the last gaze calibration, or None
+    """
+    from core.gaze_model import load_gaze_model as load
+
+    if not os.path.exists(GAZE_MODEL_FILE):
+        return None
+    try:
+        return load(GAZE_MODEL_FILE)
+    except ValueError as e:
+        print(f"⚠️ Ignoring gaze model: {e}")
+        return None
+
+
+def load_audio():
+    from core.audio import AudioEngine
+    from core.sound_bank import load_piano_samples, SampleBank
+
+    samples, sample_rate = load_piano_samples()
+    bank = SampleBank(samples, sample_rate, max_bytes=SAMPLE_CACHE_BYTES)
+    audio = AudioEngine(bank, block_size=AUDIO_BLOCK_SIZE, max_voices=AUDIO_MAX_VOICES)
+    audio.start()
+    return audio
+
+
+class App:
+    """
+    Single-process shell that owns the camera, face tracker, sounds and
+    window for the whole session and switches scenes in place
+    """
+
+    def __init__(self, scene_classes=None, camera_source=0, replay_path=None, realtime=True, record_path=None, record_frames=False, trace_path=None, cursor_mode=CURSOR_MODE, use_worker=TRACKING_WORKER, display_backend=DISPLAY_BACKEND):
+        self.startup = StartupTimer()
+        self.startup.mark("app init")
+
+        pyautogui.FAILSAFE = False
+        self.screen_width, self.screen_height = pyautogui.size()
+
+        # Every scene reads and draws this cursor; the OS pointer only follows
+        # it when syncing is turned on
+        predictor = ConstantVelocityKalman(CURSOR_PREDICTION_ACCEL_PX, CURSOR_PREDICTION_NOISE_PX) if CURSOR_PREDICTION else None
+        self.cursor = CursorService(
+            self.screen_width, self.screen_height,
+            DEAD_ZONE, SENSITIVITY,
+            cursor_filter_from_calibration(SMOOTHING_FACTOR, CURSOR_FILTER_BETA, CURSOR_FILTER_D_CUTOFF),
+            predictor=predictor, max_horizon=CURSOR_PREDICTION_MAX_MS / 1000,
+            sync_os_cursor=OS_CURSOR_SYNC, sync_rate_hz=OS_CURSOR_SYNC_HZ,
+            mode=cursor_mode, fusion_weight=GAZE_FUSION_WEIGHT,
+        )
+
+        # A replay stands in for the webcam; it only maps files so it is
+        # opened right away
+        replay = ReplaySource(replay_path, realtime=realtime) if replay_path else None
+        # With the worker, landmarks arrive already inferred, like a
+        # landmark-only replay
+        use_worker = use_worker and replay is None
+        landmarks_only = use_worker or (replay is not None and replay.landmarks_only)
+        self.recorder = SessionRecorder(record_path, record_frames=record_frames) if record_path else None
+
+        self.trace_path = trace_path
+        self.show_overlay = False
+        # Where the overlay was drawn on the last frame presented
+        self.overlay_rect = None
+        if trace_path:
+            TRACER.enable()
+
+        # The face model, webcam and sample bank load in parallel while a
+        # loading frame is already on screen
+        self.preloader = Preloader(self.startup)
+        self.preloader.submit("face tracker", lambda: load_tracker(build_mesh=not landmarks_only))
+        self.preloader.submit("camera", lambda: replay or load_camera(camera_source, use_worker))
+        self.preloader.submit("audio", load_audio)
+        self.preloader.submit("gaze model", load_gaze_model)
+
+        self.display = create_display(display_backend, WINDOW_NAME, self.screen_width, self.screen_height)
+        self.startup.timed("window", self._open_window)()
+
+        self.scene_classes = scene_classes or self.startup.timed("scene imports", default_scenes)()
+        self.scenes = {}
+        self.scene = None
+        self.os_cursor_hidden = False
+
+    # Preloaded resources block on first use if still loading
+    @property
+    def tracker(self):
+        return self.preloader.result("face tracker")
+
+    @property
+    def camera(self):
+        return self.preloader.result("camera")
+
+    @property
+    def audio(self):
+        return self.preloader.result("audio")
+
+    def audio_latency(self):
+        """
+        Measured seconds from play() to the speaker, or None while the audio
+        engine is loading, muted or has not played anything yet
+        """
+        if not self.preloader.succeeded("audio"):
+            return None
+        return self.audio.latency
+
+    def _open_window(self):
+        self.display.open()
+        self._show_loading()
+
+    def _show_loading(self):
+        loading = np.zeros((self.screen_height, self.screen_width, 3), dtype=np.uint8)
+        cv2.putText(loading, "Loading...", (self.screen_width//2 - 120, self.screen_height//2), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+        self.display.present(loading)
+        self.display.poll_events()
+
+    def wait_for_preload(self):
+        # Keep the window responsive until tracking can start
+        while not self.preloader.ready("face tracker", "camera"):
+            if any(event in QUIT_EVENTS for event in self.display.poll_events(15)):
+                return False
+        return True
+
+    def set_os_cursor_hidden(self, hidden):
+        # ShowCursor keeps a display counter, so only call it on changes
+        if hidden != self.os_cursor_hidden:
+            set_os_cursor_hidden(hidden)
+            self.os_cursor_hidden = hidden
+
+    def set_blink_thresholds(self, close_ear, open_ear):
+        self.tracker.blink.set_thresholds(close_ear, open_ear)
+        # The worker's tracker keeps its own copy for flow gating
+        if isinstance(self.camera, InferenceWorker):
+            self.camera.set_blink_thresholds(close_ear, open_ear)
+
+    def toggle_overlay(self):
+        # The overlay reads its numbers from the tracer, so it needs spans
+        self.show_overlay = not self.show_overlay
+        if self.show_overlay:
+            TRACER.enable()
+        elif not self.trace_path:
+            TRACER.disable()
+
+    def frame_damage(self, overlay):
+        """
+        The scene's damage plus the overlay's corner while it is shown and
+        on the frame after, when it has to be painted over
+        """
+        damage = self.scene.damage()
+        previous = self.overlay_rect
+        if overlay is not None:
+            x0, y0, patch = overlay
+            self.overlay_rect = (x0, y0, x0 + patch.shape[1], y0 + patch.shape[0])
+        else:
+            self.overlay_rect = None
+        if damage is None:
+            return None
+        return damage + [rect for rect in (previous, self.overlay_rect) if rect is not None]
+
+    def switch_to(self, name):
+        if self.scene is not None:
+            self.scene.exit()
+
+        # Scenes are built once and reused so switching back is instant
+        if name not in self.scenes:
+            self.scenes[name] = self.scene_classes[name](self)
+        self.scene = self.scenes[name]
+        self.set_os_cursor_hidden(self.scene.hide_os_cursor)
+        self.scene.enter()
+
+    def run(self, initial_scene="menu"):
+        try:
+            if not self.wait_for_preload():
+                return
+            self.cursor.gaze_model = self.preloader.result("gaze model")
+            if self.cursor.mode != NOSE and self.cursor.gaze_model is None:
+                print("⚠️ No gaze model yet, the cursor follows the nose until Gaze Setup is run")
+            self.startup.timed("first scene", self.switch_to)(initial_scene)
+            first_frame = True
+
+            while self.camera.is_opened():
+                TRACER.frame()
+                with TRACER.span("camera.wait"):
+                    captured = self.camera.read()
+                if captured is None:
+                    break
+
+                if self.camera.landmarks_only:
+                    tracking = self.tracker.process_points(captured.points, captured.timestamp)
+                else:
+                    frame = cv2.flip(captured.frame, 1)
+                    tracking = self.tracker.process(frame, captured.timestamp)
+                if self.recorder is not None:
+                    self.recorder.write(captured, tracking)
+
+                with TRACER.span("scene.update"):
+                    next_scene = self.scene.update(tracking, captured.timestamp)
+                if next_scene == QUIT:
+                    break
+
+                with TRACER.span("scene.render"):
+                    canvas = self.scene.render()
+                overlay = TRACER.draw_overlay(canvas, self.audio_latency()) if self.show_overlay else None
+                damage = self.frame_damage(overlay)
+                with TRACER.span("display.present"):
+                    self.display.present(canvas, damage)
+                # How far ahead the cursor is predicted next frame
+                self.cursor.observe_latency(time.perf_counter() - captured.timestamp)
+                if overlay is not None:
+                    TRACER.restore_overlay(canvas, overlay)
+
+                with TRACER.span("display.events"):
+                    events = self.display.poll_events()
+                if any(event in QUIT_EVENTS for event in events):
+                    break
+                if "t" in events:
+                    self.toggle_overlay()
+
+                if first_frame:
+                    self.startup.mark("first interactive frame")
+                    self.startup.report()
+                    first_frame = False
+
+                if next_scene is not None:
+                    self.switch_to(next_scene)
+        finally:
+            self.close()
+
+    def close(self):
+        if self.scene is not None:
+            self.scene.exit()
+            self.scene = None
+        self.preloader.shutdown()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.trace_path:
+            TRACER.export_chrome(self.trace_path)
+            self.trace_path = None
+        if self.preloader.succeeded("camera"):
+            self.camera.release()
+        if self.preloader.succeeded("face tracker"):
+            self.tracker.close()
+        if self.preloader.succeeded("audio"):
+            self.audio.close()
+        self.cursor.close()
+        self.display.close()
+        self.set_os_cursor_hidden(False)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="NoseHero")
+    parser.add_argument("--record", metavar="DIR", help="record timestamps and landmarks of this session to DIR")
+    parser.add_argument("--record-frames", action="store_true", help="also record the raw camera frames")
+    parser.add_argument("--replay", metavar="DIR", help="play a recording back instead of using the webcam")
+    parser.add_argument("--fast", action="store_true", help="replay as fast as possible instead of at recorded speed")
+    parser.add_argument("--trace", metavar="JSON", help="record frame spans and write a Chrome trace on exit")
+    parser.add_argument("--cursor", choices=CURSOR_MODES, default=CURSOR_MODE, help="what moves the cursor")
+    parser.add_argument("--worker", action="store_true", default=TRACKING_WORKER, help="run the camera and face inference in a separate process")
+    parser.add_argument("--display", choices=sorted(DISPLAY_BACKENDS), default=DISPLAY_BACKEND, help="how frames are shown; null shows nothing")
+    return parser.parse_args(argv)
+
+
+def run_app(initial_scene="menu", argv=None):
+    args = parse_args(argv)
+    App(
+        replay_path=args.replay,
+        realtime=not args.fast,
+        record_path=args.record,
+        record_frames=args.record_frames,
+        trace_path=args.trace,
+        cursor_mode=args.cursor,
+        use_worker=args.worker,
+        display_backend=args.display,
+    ).run(initial_scene)
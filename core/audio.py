@@ -0,0 +1,219 @@
+import collections
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+
+class Voice:
+    """
+    One playing sample with its own gain and a linear fade-out envelope
+    """
+
+    def __init__(self, samples, gain=1.0, fade_out_frames=None, start_frame=None):
+        self.samples = samples
+        # Output frame to start on, None for the next block
+        self.start_frame = start_frame
+        self.position = 0
+        self.gain = gain
+        self.level = 1.0
+        # Envelope change per frame; 0 holds the level until the sample ends
+        self.step = 0.0
+        self.stolen = False
+        self.requested_at = time.perf_counter()
+        if fade_out_frames:
+            self.release(fade_out_frames)
+
+    def release(self, frames):
+        self.step = -self.level / max(frames, 1)
+
+    def steal(self, frames):
+        # Fading over one block instead of cutting avoids a click
+        self.stolen = True
+        self.release(frames)
+
+    def mix_into(self, out):
+        """
+        Adds the next len(out) frames of this voice to out. Returns whether
+        the voice is still playing afterwards
+        """
+        chunk = self.samples[self.position:self.position + len(out)]
+        count = len(chunk)
+        if self.step:
+            envelope = self.level + self.step * np.arange(1, count + 1, dtype=np.float32)
+            np.maximum(envelope, 0.0, out=envelope)
+            out[:count] += chunk * (self.gain * envelope)[:, None]
+            self.level = float(envelope[-1]) if count else 0.0
+        else:
+            out[:count] += chunk * self.gain
+        self.position += count
+        return self.position < len(self.samples) and self.level > 0.0
+
+
+class AudioEngine:
+    """
+    Plays samples from a SampleBank by mixing voices in the sounddevice output
+    callback, with a small fixed block size for low output latency.
+
+    play() only queues a voice, so it is safe to call from the frame loop;
+    the voice list itself is only touched by the audio thread. Above
+    max_voices the oldest voices are faded out to make room.
+
+    The engine is also a clock: time() is the position, in seconds of
+    output samples, of what is reaching the speaker right now, and
+    play_at() starts a voice on the exact sample for a time on that clock.
+    When muted the clock runs on time.perf_counter() instead.
+    """
+
+    def __init__(self, bank, channels=2, block_size=256, max_voices=16, latency="low"):
+        self.bank = bank
+        self.sample_rate = bank.sample_rate
+        self.channels = channels
+        self.block_size = block_size
+        self.max_voices = max_voices
+        self.requested_latency = latency
+
+        self.voices = []
+        self._pending = collections.deque()
+        # Voices waiting for their start frame, (start_frame, order, voice)
+        self._scheduled = []
+        self._order = itertools.count()
+        self.frames_mixed = 0
+        # (output frame, perf_counter time it is heard), set every callback
+        self._clock_anchor = (0, time.perf_counter())
+        self._last_time = 0.0
+        self.stream = None
+        # Seconds from play() to the block reaching the DAC, running average
+        self.latency = None
+        # What the audio backend reports for its own buffering
+        self.output_latency = None
+
+    @property
+    def running(self):
+        return self.stream is not None
+
+    def start(self):
+        """
+        Opens the output stream. Without an audio device or PortAudio the
+        engine stays silent and play() does nothing
+        """
+        try:
+            import sounddevice
+            self.stream = sounddevice.OutputStream(
+                samplerate=self.sample_rate, blocksize=self.block_size, channels=self.channels,
+                dtype="float32", latency=self.requested_latency, callback=self._callback,
+            )
+            self.stream.start()
+        except Exception as e:
+            print(f"⚠️ Audio output unavailable, sounds are muted: {e}")
+            self.stream = None
+            return False
+
+        self.output_latency = self.stream.latency
+        # The clock restarts from the first output sample
+        self._clock_anchor = (self.frames_mixed, time.perf_counter() + self.output_latency)
+        self._last_time = 0.0
+        print(f"🔊 Audio out: {self.block_size} frame blocks at {self.sample_rate} Hz, {self.output_latency * 1000:.1f} ms device latency")
+        return True
+
+    def time(self):
+        """
+        Seconds of audio heard so far, interpolated between callbacks with
+        perf_counter and never going backwards
+        """
+        frame, heard_at = self._clock_anchor
+        now = frame / self.sample_rate + time.perf_counter() - heard_at
+        self._last_time = max(self._last_time, now)
+        return self._last_time
+
+    def clock_at(self, perf_time):
+        """
+        The audio clock at an earlier time.perf_counter() reading, such as
+        a frame's capture timestamp
+        """
+        return self.time() - (time.perf_counter() - perf_time)
+
+    def play_at(self, when, note, gain=1.0, fade_out=None, octave=None):
+        """
+        Like play(), but the voice starts on the output sample for when on
+        the audio clock, or in the next block if that has already passed
+        """
+        if self.stream is None:
+            return
+        samples = self.bank.get(note, octave)
+        if samples is None:
+            return
+        self._queue(samples, gain, fade_out, int(round(when * self.sample_rate)))
+
+    def play(self, note, gain=1.0, fade_out=None, octave=None):
+        """
+        Starts a new voice for note at gain (0-1), in octave if given. With
+        fade_out (seconds) it fades to silence over that time instead of
+        ringing out
+        """
+        if self.stream is None:
+            return
+        samples = self.bank.get(note, octave)
+        if samples is None:
+            return
+        self._queue(samples, gain, fade_out, None)
+
+    def _queue(self, samples, gain, fade_out, start_frame):
+        fade_out_frames = int(fade_out * self.sample_rate) if fade_out else None
+        self._pending.append(Voice(samples, max(0.0, min(1.0, gain)), fade_out_frames, start_frame))
+
+    def mix(self, out):
+        """
+        Fills out, a (frames, channels) float32 block, with the next frames
+        of every voice. Returns the voices that started in this block
+        """
+        out.fill(0.0)
+        block_start = self.frames_mixed
+        block_end = block_start + len(out)
+        started = []
+        while self._pending:
+            voice = self._pending.popleft()
+            if voice.start_frame is None:
+                self.voices.append(voice)
+                started.append(voice)
+            else:
+                heapq.heappush(self._scheduled, (voice.start_frame, next(self._order), voice))
+
+        # Scheduled voices due in this block start mid-block, on their frame
+        offsets = {}
+        while self._scheduled and self._scheduled[0][0] < block_end:
+            start_frame, _, voice = heapq.heappop(self._scheduled)
+            offsets[voice] = max(0, start_frame - block_start)
+            self.voices.append(voice)
+
+        # Voice stealing: oldest first, a stolen voice ends with this block
+        live = [voice for voice in self.voices if not voice.stolen]
+        for voice in live[:max(0, len(live) - self.max_voices)]:
+            voice.steal(len(out))
+
+        self.voices = [voice for voice in self.voices if voice.mix_into(out[offsets.get(voice, 0):])]
+        np.clip(out, -1.0, 1.0, out=out)
+        self.frames_mixed = block_end
+        return started
+
+    def _callback(self, outdata, frames, time_info, status):
+        block_start = self.frames_mixed
+        started = self.mix(outdata)
+
+        # Time until this block is audible; some backends report 0
+        ahead = time_info.outputBufferDacTime - time_info.currentTime
+        if ahead <= 0:
+            ahead = self.output_latency or 0.0
+        now = time.perf_counter()
+        self._clock_anchor = (block_start, now + ahead)
+        for voice in started:
+            seconds = now - voice.requested_at + ahead
+            self.latency = seconds if self.latency is None else 0.9 * self.latency + 0.1 * seconds
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.bank.close()
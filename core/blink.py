@@ -0,0 +1,82 @@
+import numpy as np
+
+FIRE_ON_CLOSE = "close"
+FIRE_ON_RELEASE = "release"
+
+
+class BlinkDetector:
+    """
+    Turns the per-frame eye aspect ratio into blink clicks, timed in
+    milliseconds so it behaves the same at any frame rate.
+
+    The eyes count as closed once EAR drops below close_threshold and as
+    open again only once it rises above open_threshold; the gap between the
+    two keeps a noisy EAR near one threshold from flickering. A closure has
+    to last min_closed_ms to count. With fire_on="close" the click fires as
+    soon as that hold time is reached, otherwise when the eyes reopen.
+    """
+
+    def __init__(self, close_threshold=0.2, open_threshold=0.24, min_closed_ms=80, fire_on=FIRE_ON_CLOSE):
+        if fire_on not in (FIRE_ON_CLOSE, FIRE_ON_RELEASE):
+            raise ValueError(f"fire_on must be '{FIRE_ON_CLOSE}' or '{FIRE_ON_RELEASE}', got {fire_on!r}")
+        self.set_thresholds(close_threshold, open_threshold)
+        self.min_closed_ms = min_closed_ms
+        self.fire_on = fire_on
+        self.reset()
+
+    def set_thresholds(self, close_threshold, open_threshold):
+        if open_threshold < close_threshold:
+            raise ValueError("open_threshold must not be below close_threshold")
+        self.close_threshold = close_threshold
+        self.open_threshold = open_threshold
+
+    def reset(self):
+        self.closed = False
+        self.closed_since = None
+        self.fired = False
+
+    def update(self, ear, timestamp):
+        """
+        Feeds one frame's EAR (None without a face) and its capture time in
+        seconds. Returns True on the frame a blink click fires
+        """
+        if ear is None:
+            # Losing the face mid-blink must not count as reopening the eyes
+            self.reset()
+            return False
+
+        if not self.closed:
+            if ear < self.close_threshold:
+                self.closed = True
+                self.closed_since = timestamp
+                self.fired = False
+            else:
+                return False
+
+        held_ms = (timestamp - self.closed_since) * 1000
+        if ear > self.open_threshold:
+            self.closed = False
+            return self.fire_on == FIRE_ON_RELEASE and held_ms >= self.min_closed_ms
+
+        if self.fire_on == FIRE_ON_CLOSE and not self.fired and held_ms >= self.min_closed_ms:
+            self.fired = True
+            return True
+        return False
+
+
+def thresholds_from_samples(open_ears, closed_ears, min_gap=0.02, min_gap_fraction=0.1):
+    """
+    Close/open thresholds from EAR samples taken with the eyes open and
+    shut, placed a third and two thirds of the way across the gap between
+    the two distributions. Returns None if they overlap or the gap is
+    narrower than min_gap or min_gap_fraction of the open EAR, which would
+    leave too little hysteresis to ride out noise
+    """
+    if len(open_ears) == 0 or len(closed_ears) == 0:
+        return None
+    open_low = float(np.percentile(open_ears, 10))
+    closed_high = float(np.percentile(closed_ears, 90))
+    gap = open_low - closed_high
+    if gap < max(min_gap, min_gap_fraction * open_low):
+        return None
+    return closed_high + gap / 3, closed_high + 2 * gap / 3
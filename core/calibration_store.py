@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+
+# A store is a directory with meta.json and one flat float32 file of rows
+# (features..., target_x, target_y), appended to as samples come in and
+# read back with np.memmap
+META_FILE = "meta.json"
+SAMPLES_FILE = "samples.f32"
+FORMAT_VERSION = 1
+NUM_TARGETS = 2
+
+
+class CalibrationStore:
+    """
+    Append-only on-disk collection of gaze calibration samples: feature
+    vectors and the screen position the user was looking at. Samples
+    survive restarts, so a session can train on every earlier calibration.
+    """
+
+    def __init__(self, path, num_features):
+        self.path = path
+        self.num_features = num_features
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta["version"] != FORMAT_VERSION:
+                raise ValueError(f"Unsupported calibration store version {meta['version']}")
+            if meta["num_features"] != num_features:
+                raise ValueError(f"Calibration store has {meta['num_features']} features, expected {num_features}")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"version": FORMAT_VERSION, "num_features": num_features, "num_targets": NUM_TARGETS}, f, indent=2)
+
+        self._row = np.zeros(num_features + NUM_TARGETS, dtype="<f4")
+        self._samples_path = os.path.join(path, SAMPLES_FILE)
+        self._file = open(self._samples_path, "ab")
+        # Drop a partial row left by a crash mid-write
+        row_bytes = self._row.nbytes
+        size = self._file.tell()
+        if size % row_bytes:
+            self._file.truncate(size - size % row_bytes)
+            self._file.seek(0, os.SEEK_END)
+        self.count = self._file.tell() // row_bytes
+
+    def append(self, features, target):
+        self._row[:self.num_features] = features
+        self._row[self.num_features:] = target
+        self._file.write(self._row.tobytes())
+        # Flushed per sample so memmap readers and crashes see whole rows
+        self._file.flush()
+        self.count += 1
+
+    def samples(self):
+        """
+        (X, y) as read-only memory-mapped views, or empty arrays when the
+        store has no samples yet
+        """
+        width = self.num_features + NUM_TARGETS
+        if self.count == 0:
+            return np.zeros((0, self.num_features), dtype=np.float32), np.zeros((0, NUM_TARGETS), dtype=np.float32)
+        rows = np.memmap(self._samples_path, dtype="<f4", mode="r", shape=(self.count, width))
+        return rows[:, :self.num_features], rows[:, self.num_features:]
+
+    def clear(self):
+        self._file.truncate(0)
+        self._file.seek(0)
+        self.count = 0
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import cv2
+
+
+class CapturedFrame:
+    """
+    A frame together with the time it was read from the camera and its
+    sequence number (counting every frame the driver delivered)
+    """
+
+    def __init__(self, frame, timestamp, sequence, points=None):
+        self.frame = frame
+        self.timestamp = timestamp
+        self.sequence = sequence
+        # Landmarks supplied by a landmark-only replay, which skips inference
+        self.points = points
+
+
+class CameraCapture:
+    """
+    Reads frames from a cv2.VideoCapture on a background thread into a small
+    ring buffer so the frame loop always works on the newest frame instead of
+    whatever the driver queued up while inference was running
+    """
+
+    # Live frames always go through face inference
+    landmarks_only = False
+
+    def __init__(self, source=0, buffer_size=3):
+        self.cap = cv2.VideoCapture(source)
+        # Keep the driver queue as short as the backend allows
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.buffer_size = buffer_size
+        self._ring = [None] * buffer_size
+        self._latest_sequence = -1
+        self._last_read_sequence = -1
+        self._condition = threading.Condition()
+        self._running = self.cap.isOpened()
+
+        # Frames read from the camera / frames overwritten before any
+        # consumer saw them
+        self.frames_captured = 0
+        self.frames_dropped = 0
+
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        if self._running:
+            self._thread.start()
+
+    def _capture_loop(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            timestamp = time.perf_counter()
+            with self._condition:
+                if not ret:
+                    self._running = False
+                    self._condition.notify_all()
+                    break
+
+                sequence = self._latest_sequence + 1
+                self._ring[sequence % self.buffer_size] = CapturedFrame(frame, timestamp, sequence)
+                if self._latest_sequence > self._last_read_sequence:
+                    self.frames_dropped += 1
+                self._latest_sequence = sequence
+                self.frames_captured += 1
+                self._condition.notify_all()
+
+    def is_opened(self):
+        with self._condition:
+            return self._running or self._latest_sequence > self._last_read_sequence
+
+    def read(self, timeout=1.0):
+        """
+        Returns the newest CapturedFrame not yet handed out, waiting up to
+        timeout seconds for one to arrive. Returns None when the camera
+        stopped or nothing arrived in time
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._latest_sequence > self._last_read_sequence or not self._running,
+                timeout,
+            )
+            if self._latest_sequence <= self._last_read_sequence:
+                return None
+
+            self._last_read_sequence = self._latest_sequence
+            return self._ring[self._latest_sequence % self.buffer_size]
+
+    def stats(self):
+        return {
+            "captured": self.frames_captured,
+            "dropped": self.frames_dropped,
+        }
+
+    def release(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self.cap.release()
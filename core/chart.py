@@ -0,0 +1,167 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from core.sound_bank import NOTE_ORDER, BASE_OCTAVE, MIN_OCTAVE, MAX_OCTAVE
+
+# A chart is written as JSON:
+#
+#   {"bpm": 100, "offset": 1.0, "columns": 3,
+#    "notes": [[0, 1], [1.5, 0], ...],
+#    "backing": [[0, "C", 3], [2, "G", 2], ...]}
+#
+# Each note is [position, column]; each optional backing note is
+# [position, note name, octave], played automatically; octaves have to be
+# within MIN_OCTAVE-MAX_OCTAVE of the sample bank. With "bpm" positions
+# are in beats, otherwise in seconds; "offset" (seconds) shifts everything.
+# Before playing, a chart is compiled to a little-endian binary timeline next
+# to it: a header, then float64 times sorted ascending for the notes and the
+# backing, then int16 columns for the notes and int16 pitches
+# (octave * 12 + semitone) for the backing. All of them are memory-mapped, so
+# opening a chart costs the same however long it is
+MAGIC = b"NHCH"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sHHQQ")
+COMPILED_EXTENSION = ".nhc"
+
+
+def beats_to_times(positions, chart):
+    bpm = chart.get("bpm")
+    times = positions * 60.0 / bpm if bpm else positions
+    return times + float(chart.get("offset", 0.0))
+
+
+def compile_chart(source_path, compiled_path):
+    """
+    Parses the JSON chart at source_path and writes its binary timeline
+    """
+    with open(source_path, "r") as f:
+        chart = json.load(f)
+
+    num_columns = int(chart.get("columns", 3))
+    notes = np.asarray(chart.get("notes", []), dtype=np.float64).reshape(-1, 2)
+    columns = notes[:, 1]
+    if np.any(columns != np.round(columns)) or np.any((columns < 0) | (columns >= num_columns)):
+        raise ValueError(f"{source_path} has notes outside columns 0-{num_columns - 1}")
+    times = beats_to_times(notes[:, 0], chart)
+
+    backing = chart.get("backing", [])
+    try:
+        pitches = np.array([(entry[2] if len(entry) > 2 else BASE_OCTAVE) * 12 + NOTE_ORDER.index(entry[1]) for entry in backing], dtype=np.int64)
+    except ValueError:
+        raise ValueError(f"{source_path} has backing notes with unknown names, expected one of {NOTE_ORDER}")
+    if np.any((pitches < MIN_OCTAVE * 12) | (pitches >= (MAX_OCTAVE + 1) * 12)):
+        raise ValueError(f"{source_path} has backing notes outside octaves {MIN_OCTAVE}-{MAX_OCTAVE}")
+    backing_times = beats_to_times(np.array([entry[0] for entry in backing], dtype=np.float64), chart)
+
+    if np.any(times < 0) or np.any(backing_times < 0):
+        raise ValueError(f"{source_path} has notes before the start of the song")
+
+    # Stable, so notes on the same beat keep their written order
+    order = np.argsort(times, kind="stable")
+    backing_order = np.argsort(backing_times, kind="stable")
+    with open(compiled_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, num_columns, len(times), len(backing_times)))
+        f.write(times[order].astype("<f8").tobytes())
+        f.write(backing_times[backing_order].astype("<f8").tobytes())
+        f.write(columns[order].astype("<i2").tobytes())
+        f.write(pitches[backing_order].astype("<i2").tobytes())
+
+
+def map_array(path, dtype, offset, count):
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+
+
+class Chart:
+    """
+    Read-only timeline of a compiled chart: note times in seconds from the
+    start of the song and the column of each note, sorted by time, and the
+    same for the backing notes with their pitch
+    """
+
+    def __init__(self, compiled_path):
+        with open(compiled_path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{compiled_path} is too short to be a chart")
+        magic, version, num_columns, count, backing_count = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{compiled_path} is not a compiled chart")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported chart version {version}")
+        expected = HEADER.size + (count + backing_count) * 10
+        if os.path.getsize(compiled_path) != expected:
+            raise ValueError(f"{compiled_path} is {os.path.getsize(compiled_path)} bytes, expected {expected}")
+
+        self.num_columns = num_columns
+        offset = HEADER.size
+        self.times = map_array(compiled_path, "<f8", offset, count)
+        offset += count * 8
+        self.backing_times = map_array(compiled_path, "<f8", offset, backing_count)
+        offset += backing_count * 8
+        self.columns = map_array(compiled_path, "<i2", offset, count)
+        offset += count * 2
+        self.backing_pitches = map_array(compiled_path, "<i2", offset, backing_count)
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self):
+        """
+        Time of the last note or backing note
+        """
+        ends = [float(times[-1]) for times in (self.times, self.backing_times) if len(times)]
+        return max(ends, default=0.0)
+
+    def index_at(self, time):
+        """
+        Index of the first note at or after time
+        """
+        return int(np.searchsorted(self.times, time, side="left"))
+
+    def between(self, start, end):
+        """
+        Index range of the notes with start <= time < end
+        """
+        return self.index_at(start), self.index_at(end)
+
+    def backing_index_at(self, time):
+        """
+        Index of the first backing note at or after time
+        """
+        return int(np.searchsorted(self.backing_times, time, side="left"))
+
+    def backing_note(self, index):
+        """
+        (note name, octave) of a backing note
+        """
+        octave, semitone = divmod(int(self.backing_pitches[index]), 12)
+        return NOTE_ORDER[semitone], octave
+
+
+def load_chart(source_path, num_columns=None):
+    """
+    Opens the chart at source_path, compiling it first when the binary
+    timeline is missing, older than the JSON or from an older version.
+    With num_columns, charts written for a different number of columns are
+    rejected with a ValueError
+    """
+    compiled_path = os.path.splitext(source_path)[0] + COMPILED_EXTENSION
+    chart = None
+    if os.path.exists(compiled_path) and os.path.getmtime(compiled_path) >= os.path.getmtime(source_path):
+        try:
+            chart = Chart(compiled_path)
+        except ValueError as e:
+            print(f"⚠️ Recompiling chart: {e}")
+    if chart is None:
+        compile_chart(source_path, compiled_path)
+        print(f"🎼 Compiled chart {source_path}")
+        chart = Chart(compiled_path)
+    if num_columns is not None and chart.num_columns != num_columns:
+        raise ValueError(f"{source_path} has {chart.num_columns} columns, expected {num_columns}")
+    return chart
@@ -0,0 +1,205 @@
+import ctypes
+import sys
+import threading
+import time
+
+from core.filters import OneEuroFilter
+from core.tracing import TRACER
+
+# Where the cursor takes its position from
+NOSE = "nose"
+GAZE = "gaze"
+FUSED = "fused"
+CURSOR_MODES = (NOSE, GAZE, FUSED)
+
+
+def set_os_cursor_hidden(hidden):
+    """
+    Hides or shows the system pointer. Only supported on Windows; elsewhere
+    the pointer is left alone
+    """
+    if sys.platform == "win32":
+        ctypes.windll.user32.ShowCursor(not hidden)
+
+
+class OSCursorSync:
+    """
+    Mirrors the cursor onto the OS pointer from a background thread at a
+    bounded rate, so pyautogui never runs on the frame loop
+    """
+
+    def __init__(self, rate_hz=30):
+        import pyautogui
+
+        pyautogui.FAILSAFE = False
+        self._move_to = pyautogui.moveTo
+        self.interval = 1.0 / rate_hz
+        self._target = None
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._sync_loop, daemon=True, name="os-cursor")
+        self._thread.start()
+
+    def push(self, x, y):
+        with self._condition:
+            self._target = (x, y)
+            self._condition.notify()
+
+    def _sync_loop(self):
+        last = None
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._target != last or not self._running)
+                if not self._running:
+                    return
+                target = self._target
+
+            with TRACER.span("cursor.os_move"):
+                self._move_to(target[0], target[1], _pause=False)
+            last = target
+            time.sleep(self.interval)
+
+    def close(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=1.0)
+
+
+class CursorService:
+    """
+    Holds the smoothed nose cursor in-process for hit-testing and drawing.
+    Mirroring it to the OS pointer is optional and never blocks the caller.
+
+    With a predictor, the cursor is extrapolated along the nose's estimated
+    velocity by the measured capture-to-display latency, capped at
+    max_horizon seconds, so it sits where the nose is when the frame shows.
+
+    In GAZE mode a trained GazeEstimator places the cursor from the frame's
+    eye features instead of the nose; FUSED blends both with fusion_weight
+    on the gaze side. Without a gaze model every mode follows the nose
+    """
+
+    def __init__(self, screen_width, screen_height, dead_zone, sensitivity, cursor_filter=None, predictor=None, max_horizon=0.06, sync_os_cursor=False, sync_rate_hz=30, mode=NOSE, gaze_model=None, fusion_weight=0.5):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.center_x, self.center_y = screen_width // 2, screen_height // 2
+        self.dead_zone = dead_zone
+        self.sensitivity = sensitivity
+        self.filter = cursor_filter or OneEuroFilter()
+        self.predictor = predictor
+        self.max_horizon = max_horizon
+        self.latency = None
+        self.horizon = 0.0
+
+        self.gaze_model = gaze_model
+        self.fusion_weight = fusion_weight
+        self.os_sync = OSCursorSync(sync_rate_hz) if sync_os_cursor else None
+        self.reset()
+        self.set_mode(mode)
+
+    def set_mode(self, mode):
+        if mode not in CURSOR_MODES:
+            raise ValueError(f"Unknown cursor mode {mode!r}, expected one of {CURSOR_MODES}")
+        self.mode = mode
+        # Start the new source from where the cursor is now
+        self.reset(self.x, self.y)
+
+    def reset(self, x=None, y=None):
+        self.x = self.center_x if x is None else x
+        self.y = self.center_y if y is None else y
+        self.filter.reset((self.x, self.y))
+        if self.predictor is not None:
+            self.predictor.reset()
+
+    @property
+    def position(self):
+        return self.x, self.y
+
+    def target(self, nose):
+        """
+        Maps a normalized nose position to an unsmoothed screen position
+        """
+        nose_x_norm = nose[0] - 0.5
+        nose_y_norm = nose[1] - 0.5
+
+        if abs(nose_x_norm) < self.dead_zone:
+            nose_x_norm = 0
+        if abs(nose_y_norm) < self.dead_zone:
+            nose_y_norm = 0
+
+        target_x = self.center_x + (nose_x_norm * self.screen_width * self.sensitivity)
+        target_y = self.center_y + (nose_y_norm * self.screen_height * self.sensitivity)
+        return target_x, target_y
+
+    @property
+    def gaze_active(self):
+        return self.mode != NOSE and self.gaze_model is not None
+
+    def follow(self, tracking, timestamp=None):
+        """
+        Moves the cursor for one frame of a face-found TrackingResult in the
+        current mode and returns it
+        """
+        if not self.gaze_active:
+            return self.update(tracking.nose, timestamp)
+        if tracking.blink_detected:
+            # Eye features are meaningless while the eyes are shut; hold the
+            # cursor so a blink click lands where the user was looking
+            return self.x, self.y
+
+        gaze_x, gaze_y = self.gaze_model.predict(tracking.features)
+        if self.mode == FUSED:
+            nose_x, nose_y = self.target(tracking.nose)
+            w = self.fusion_weight
+            return self.update_target((w * gaze_x + (1 - w) * nose_x, w * gaze_y + (1 - w) * nose_y), timestamp)
+        return self.update_target((gaze_x, gaze_y), timestamp)
+
+    def update(self, nose, timestamp=None):
+        """
+        Moves the cursor towards the nose position and returns it.
+        timestamp is the capture time of the frame the nose came from
+        """
+        return self.update_target(self.target(nose), timestamp)
+
+    def update_target(self, target, timestamp=None):
+        """
+        Moves the cursor towards a raw screen position and returns it
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        x, y = self.filter(target, timestamp)
+        if self.predictor is not None:
+            velocity_x, velocity_y = self.predictor(target, timestamp)
+            x += velocity_x * self.horizon
+            y += velocity_y * self.horizon
+        self.move_to(x, y)
+        return self.x, self.y
+
+    def observe_latency(self, seconds):
+        """
+        Feeds one capture-to-display latency sample; the prediction horizon
+        follows their running average
+        """
+        if seconds < 0:
+            return
+        self.latency = seconds if self.latency is None else 0.9 * self.latency + 0.1 * seconds
+        self.horizon = min(self.latency, self.max_horizon)
+
+    def move_to(self, x, y):
+        self.x = max(0, min(self.screen_width - 1, int(x)))
+        self.y = max(0, min(self.screen_height - 1, int(y)))
+        if self.os_sync is not None:
+            self.os_sync.push(self.x, self.y)
+
+    def inside(self, rect):
+        """
+        Whether the cursor is strictly inside an (x, y, w, h) rectangle
+        """
+        x, y, w, h = rect
+        return x < self.x < x + w and y < self.y < y + h
+
+    def close(self):
+        if self.os_sync is not None:
+            self.os_sync.close()
+            self.os_sync = None
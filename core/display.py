@@ -0,0 +1,145 @@
+import time
+
+import cv2
+import numpy as np
+
+# Event poll_events() reports when the window is closed; keys are reported
+# as the character typed
+CLOSE = "close"
+
+
+class Display:
+    """
+    Where finished frames go. present() shows a BGR canvas; damage, when
+    given, lists the (x0, y0, x1, y1) rects that changed since the previous
+    canvas presented, and None means the whole frame. poll_events() is the
+    one place keyboard and window events are read, waiting up to wait_ms
+    """
+
+    def __init__(self, title, width, height):
+        self.title = title
+        self.width = width
+        self.height = height
+
+    def open(self):
+        pass
+
+    def present(self, canvas, damage=None):
+        raise NotImplementedError
+
+    def poll_events(self, wait_ms=1):
+        return []
+
+    def close(self):
+        pass
+
+
+class OpenCVDisplay(Display):
+    """
+    A cv2.imshow window, which uploads the whole frame every time. Key
+    presses are only read during cv2.waitKey, so poll_events() also pumps
+    the window
+    """
+
+    def open(self):
+        cv2.namedWindow(self.title, cv2.WND_PROP_FULLSCREEN)
+        cv2.setWindowProperty(self.title, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+    def present(self, canvas, damage=None):
+        cv2.imshow(self.title, canvas)
+
+    def poll_events(self, wait_ms=1):
+        key = cv2.waitKey(max(1, wait_ms)) & 0xFF
+        return [] if key == 0xFF else [chr(key)]
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class PygameDisplay(Display):
+    """
+    A full-screen pygame window that only copies and flips the damaged
+    rects. The canvas is wrapped as a BGR surface without copying, so SDL
+    converts just those pixels straight from the NumPy buffer
+    """
+
+    _pygame = None
+
+    def open(self):
+        import pygame
+
+        self._pygame = pygame
+        pygame.display.init()
+        pygame.display.set_caption(self.title)
+        self.screen = pygame.display.set_mode((self.width, self.height), pygame.FULLSCREEN)
+        # The canvas the wrapping surface was made for; compositors reuse
+        # their frame buffer, so this is rebuilt only when scenes switch
+        self._canvas = None
+        self._surface = None
+
+    def _wrap(self, canvas):
+        if canvas is not self._canvas:
+            height, width = canvas.shape[:2]
+            self._canvas = canvas if canvas.flags.c_contiguous else np.ascontiguousarray(canvas)
+            self._surface = self._pygame.image.frombuffer(self._canvas, (width, height), "BGR")
+            return True
+        return False
+
+    def present(self, canvas, damage=None):
+        # A canvas not presented before has nothing to be relative to
+        if self._wrap(canvas) or damage is None:
+            self.screen.blit(self._surface, (0, 0))
+            self._pygame.display.flip()
+            return
+
+        rects = [self._pygame.Rect(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in damage]
+        for rect in rects:
+            self.screen.blit(self._surface, rect, rect)
+        self._pygame.display.update(rects)
+
+    def poll_events(self, wait_ms=1):
+        pygame = self._pygame
+        events = []
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                events.append(CLOSE)
+            elif event.type == pygame.KEYDOWN and event.unicode:
+                events.append(event.unicode)
+        if not events and wait_ms > 1:
+            time.sleep(wait_ms / 1000)
+        return events
+
+    def close(self):
+        if self._pygame is not None:
+            self._canvas = self._surface = None
+            self._pygame.display.quit()
+
+
+class NullDisplay(Display):
+    """
+    Shows nothing and never reports input, for headless runs and
+    benchmarks
+    """
+
+    def present(self, canvas, damage=None):
+        pass
+
+    def poll_events(self, wait_ms=1):
+        if wait_ms > 1:
+            time.sleep(wait_ms / 1000)
+        return []
+
+
+DISPLAY_BACKENDS = {
+    "opencv": OpenCVDisplay,
+    "pygame": PygameDisplay,
+    "null": NullDisplay,
+}
+
+
+def create_display(backend, title, width, height):
+    try:
+        display_class = DISPLAY_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown display backend {backend!r}, expected one of {sorted(DISPLAY_BACKENDS)}")
+    return display_class(title, width, height)
@@ -0,0 +1,157 @@
+import math
+
+# The calibrated SMOOTHING_FACTOR was tuned as a per-frame blend at about
+# this frame rate, which is what the filters below convert it from
+REFERENCE_FPS = 30.0
+
+
+def cutoff_from_smoothing(smoothing, reference_fps=REFERENCE_FPS):
+    """
+    Cutoff frequency (Hz) of a first-order low-pass that lags like the
+    per-frame exponential blend with this smoothing factor does at
+    reference_fps
+    """
+    smoothing = min(max(smoothing, 0.0), 0.99)
+    if smoothing == 0:
+        return float("inf")
+    tau = smoothing / (1 - smoothing) / reference_fps
+    return 1 / (2 * math.pi * tau)
+
+
+def _alpha(cutoff, dt):
+    if math.isinf(cutoff):
+        return 1.0
+    tau = 1 / (2 * math.pi * cutoff)
+    return 1 / (1 + tau / dt)
+
+
+class ExponentialFilter:
+    """
+    The original per-frame blend: out = (1 - s) * value + s * previous.
+    Its lag is counted in frames, so it drifts with the frame rate
+    """
+
+    def __init__(self, smoothing):
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self, value=None):
+        self.value = None if value is None else tuple(value)
+
+    def __call__(self, value, timestamp=None):
+        if self.value is None:
+            self.value = tuple(value)
+        else:
+            s = self.smoothing
+            self.value = tuple((1 - s) * v + s * p for v, p in zip(value, self.value))
+        return self.value
+
+
+class OneEuroFilter:
+    """
+    One Euro filter (Casiez et al. 2012) over a fixed number of channels.
+
+    A low-pass whose cutoff rises with speed: at rest it smooths at
+    min_cutoff Hz to kill jitter, and while moving beta opens it up to cut
+    lag. Steps are scaled by the time between samples, so the feel does not
+    change with the frame rate.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self, value=None):
+        self.value = None if value is None else tuple(value)
+        self.velocity = None
+        self.timestamp = None
+
+    def __call__(self, value, timestamp):
+        if self.value is None or self.timestamp is None:
+            self.value = tuple(value)
+            self.velocity = (0.0,) * len(self.value)
+            self.timestamp = timestamp
+            return self.value
+
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            # Same or out-of-order sample, nothing to integrate
+            return self.value
+        self.timestamp = timestamp
+
+        alpha_d = _alpha(self.d_cutoff, dt)
+        velocity = []
+        filtered = []
+        for v, p, pv in zip(value, self.value, self.velocity):
+            dv = alpha_d * ((v - p) / dt) + (1 - alpha_d) * pv
+            a = _alpha(self.min_cutoff + self.beta * abs(dv), dt)
+            velocity.append(dv)
+            filtered.append(a * v + (1 - a) * p)
+
+        self.velocity = tuple(velocity)
+        self.value = tuple(filtered)
+        return self.value
+
+
+def cursor_filter_from_calibration(smoothing, beta, d_cutoff=1.0, reference_fps=REFERENCE_FPS):
+    """
+    One Euro filter whose resting cutoff matches the calibrated smoothing
+    """
+    return OneEuroFilter(cutoff_from_smoothing(smoothing, reference_fps), beta, d_cutoff)
+
+
+class ConstantVelocityKalman:
+    """
+    Per-channel Kalman filter with a constant-velocity motion model. Fed
+    raw positions, it returns the estimated velocity of each channel in
+    units per second.
+
+    accel_noise is the expected acceleration (units/s^2) the model allows
+    for; measurement_noise is the standard deviation of the input.
+    """
+
+    def __init__(self, accel_noise, measurement_noise):
+        self.q = accel_noise ** 2
+        self.r = measurement_noise ** 2
+        self.reset()
+
+    def reset(self):
+        self.timestamp = None
+        self.states = None
+
+    def __call__(self, value, timestamp):
+        if self.states is None or self.timestamp is None:
+            # [position, velocity, P00, P01, P10, P11] per channel
+            self.states = [[v, 0.0, self.r, 0.0, 0.0, self.r] for v in value]
+            self.timestamp = timestamp
+            return (0.0,) * len(self.states)
+
+        dt = timestamp - self.timestamp
+        if dt > 0:
+            self.timestamp = timestamp
+            q00 = self.q * dt ** 4 / 4
+            q01 = self.q * dt ** 3 / 2
+            q11 = self.q * dt ** 2
+            for state, z in zip(self.states, value):
+                p, v, p00, p01, p10, p11 = state
+
+                # Predict
+                p += v * dt
+                p00, p01, p10, p11 = (
+                    p00 + dt * (p01 + p10) + dt * dt * p11 + q00,
+                    p01 + dt * p11 + q01,
+                    p10 + dt * p11 + q01,
+                    p11 + q11,
+                )
+
+                # Correct with the measured position
+                innovation = z - p
+                s = p00 + self.r
+                k0, k1 = p00 / s, p10 / s
+                p += k0 * innovation
+                v += k1 * innovation
+                state[:] = p, v, (1 - k0) * p00, (1 - k0) * p01, p10 - k1 * p00, p11 - k1 * p01
+
+        return tuple(state[1] for state in self.states)
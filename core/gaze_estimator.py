@@ -1,269 +1,351 @@
 import cv2
-import mediapipe as mp
 import numpy as np
-from sklearn.linear_model import Ridge
-from sklearn.preprocessing import StandardScaler
+
+
+BLINK_EAR_THRESHOLD = 0.2
+NUM_LANDMARKS = 478
+NOSE_ANCHOR_INDEX = 4
+LEFT_EYE_CORNER_INDEX = 33
+RIGHT_EYE_CORNER_INDEX = 263
+
+LEFT_EYE_INDICES = [
+    # Upper brow
+    107,
+    66,
+    105,
+    63,
+    70,
+    # Lower brow
+    55,
+    65,
+    52,
+    53,
+    46,
+    # Pupil center and around
+    468,
+    469,
+    470,
+    471,
+    472,
+    # Corners of the eye
+    133,  # Inner eye corner
+    33,  # Outer eye corner
+    # Eye upper
+    173,
+    157,
+    158,
+    159,
+    160,
+    161,
+    246,
+    # Eye lower
+    155,
+    154,
+    153,
+    145,
+    144,
+    163,
+    7,
+    # First layer around eye
+    243,
+    190,
+    56,
+    28,
+    27,
+    29,
+    30,
+    247,
+    130,
+    25,
+    110,
+    24,
+    23,
+    22,
+    26,
+    112,
+    # Second layer around eye
+    244,
+    189,
+    221,
+    222,
+    223,
+    224,
+    225,
+    113,
+    226,
+    31,
+    228,
+    229,
+    230,
+    231,
+    232,
+    233,
+    # Third layer around eye
+    193,
+    245,
+    128,
+    121,
+    120,
+    119,
+    118,
+    117,
+    111,
+    35,
+    124,
+    143,
+    156,
+]
+
+RIGHT_EYE_INDICES = [
+    # Upper brow
+    336,
+    296,
+    334,
+    293,
+    300,
+    # Lower brow
+    285,
+    295,
+    282,
+    283,
+    276,
+    # Pupil center and around
+    473,
+    476,
+    475,
+    474,
+    477,
+    # Corners of the eye
+    362,  # Inner eye corner
+    263,  # Outer eye corner
+    # Eye upper
+    398,
+    384,
+    385,
+    386,
+    387,
+    388,
+    466,
+    # Eye lower
+    382,
+    381,
+    380,
+    374,
+    373,
+    390,
+    249,
+    # First layer around eye
+    463,
+    414,
+    286,
+    258,
+    257,
+    259,
+    260,
+    467,
+    359,
+    255,
+    339,
+    254,
+    253,
+    252,
+    256,
+    341,
+    # Second layer around eye
+    464,
+    413,
+    441,
+    442,
+    443,
+    444,
+    445,
+    342,
+    446,
+    261,
+    448,
+    449,
+    450,
+    451,
+    452,
+    453,
+    # Third layer around eye
+    417,
+    465,
+    357,
+    350,
+    349,
+    348,
+    347,
+    346,
+    340,
+    265,
+    353,
+    372,
+    383,
+]
+
+MUTUAL_INDICES = [
+    4,  # Nose
+    10,  # Very top
+    151,  # Forehead
+    9,  # Between brow
+    152,  # Chin
+    234,  # Very left
+    454,  # Very right
+    58,  # Left jaw
+    288,  # Right jaw
+]
+
+# (top, outer, bottom, inner) eyelid points for each eye's aspect ratio
+EAR_INDICES = [
+    [159, 33, 145, 133],  # Left eye
+    [386, 263, 374, 362],  # Right eye
+]
 
 
 class GazeEstimator:
-    def __init__(self):
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
+    def __init__(self, face_mesh=None):
+        # A shared FaceMesh (e.g. from core.tracker.FaceTracker) can be passed
+        # in; otherwise one is only built if extract_features is used directly
+        self.face_mesh = face_mesh
+
+        # Index arrays and per-frame buffers are built once so the feature
+        # path does not allocate on every frame
+        self.subset_indices = np.array(
+            LEFT_EYE_INDICES + RIGHT_EYE_INDICES + MUTUAL_INDICES, dtype=np.intp
         )
+        self.ear_indices = np.array(EAR_INDICES, dtype=np.intp)
+        self._points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._points_flat = self._points.reshape(-1)
+        # Written through a memoryview, which takes Python floats directly
+        # without a NumPy scalar per element
+        self._points_view = memoryview(self._points_flat)
+        self._features = np.zeros((len(self.subset_indices), 3), dtype=np.float32)
+        self._features_flat = self._features.reshape(-1)
+        self._corner_delta = np.zeros(3, dtype=np.float32)
+        self._ear_points = np.zeros((2, 4, 2), dtype=np.float32)
+        self._ear_vectors = np.zeros((2, 2, 2), dtype=np.float32)
+        self._ear_lengths = np.zeros((2, 2), dtype=np.float32)
+
         self.model = None
-        self.scaler = StandardScaler()
+        self.scaler = None
         self.variable_scaling = None
 
+        # Scaler statistics kept as plain arrays so a model loaded from disk
+        # (see core.gaze_model) works without sklearn
+        self.scaler_mean = None
+        self.scaler_scale = None
+
+        # Scaler, variable scaling and Ridge folded into predict = X @ W + b
+        self.weights = None
+        self.bias = None
+        # Recursive least squares state in the scaled feature space, with a
+        # trailing constant column for the intercept
+        self._theta = None
+        self._P = None
+        self._single_output = False
+
     def extract_features(self, image):
         """
         Takes in image and returns landmarks around the eye region
         Normalization with nose tip as anchor
         """
+        if self.face_mesh is None:
+            import mediapipe as mp
+
+            self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+            )
+
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         results = self.face_mesh.process(image_rgb)
 
         if not results.multi_face_landmarks:
             return None, None
 
-        face_landmarks = results.multi_face_landmarks[0]
-        landmarks = face_landmarks.landmark
-
-        left_eye_indices = [
-            # Upper brow
-            107,
-            66,
-            105,
-            63,
-            70,
-            # Lower brow
-            55,
-            65,
-            52,
-            53,
-            46,
-            # Pupil center and around
-            468,
-            469,
-            470,
-            471,
-            472,
-            # Corners of the eye
-            133,  # Inner eye corner
-            33,  # Outer eye corner
-            # Eye upper
-            173,
-            157,
-            158,
-            159,
-            160,
-            161,
-            246,
-            # Eye lower
-            155,
-            154,
-            153,
-            145,
-            144,
-            163,
-            7,
-            # First layer around eye
-            243,
-            190,
-            56,
-            28,
-            27,
-            29,
-            30,
-            247,
-            130,
-            25,
-            110,
-            24,
-            23,
-            22,
-            26,
-            112,
-            # Second layer around eye
-            244,
-            189,
-            221,
-            222,
-            223,
-            224,
-            225,
-            113,
-            226,
-            31,
-            228,
-            229,
-            230,
-            231,
-            232,
-            233,
-            # Third layer around eye
-            193,
-            245,
-            128,
-            121,
-            120,
-            119,
-            118,
-            117,
-            111,
-            35,
-            124,
-            143,
-            156,
-        ]
-
-        right_eye_indices = [
-            # Upper brow
-            336,
-            296,
-            334,
-            293,
-            300,
-            # Lower brow
-            285,
-            295,
-            282,
-            283,
-            276,
-            # Pupil center and around
-            473,
-            476,
-            475,
-            474,
-            477,
-            # Corners of the eye
-            362,  # Inner eye corner
-            263,  # Outer eye corner
-            # Eye upper
-            398,
-            384,
-            385,
-            386,
-            387,
-            388,
-            466,
-            # Eye lower
-            382,
-            381,
-            380,
-            374,
-            373,
-            390,
-            249,
-            # First layer around eye
-            463,
-            414,
-            286,
-            258,
-            257,
-            259,
-            260,
-            467,
-            359,
-            255,
-            339,
-            254,
-            253,
-            252,
-            256,
-            341,
-            # Second layer around eye
-            464,
-            413,
-            441,
-            442,
-            443,
-            444,
-            445,
-            342,
-            446,
-            261,
-            448,
-            449,
-            450,
-            451,
-            452,
-            453,
-            # Third layer around eye
-            417,
-            465,
-            357,
-            350,
-            349,
-            348,
-            347,
-            346,
-            340,
-            265,
-            353,
-            372,
-            383,
-        ]
-
-        mutual_indices = [
-            4,  # Nose
-            10,  # Very top
-            151,  # Forehead
-            9,  # Between brow
-            152,  # Chin
-            234,  # Very left
-            454,  # Very right
-            58,  # Left jaw
-            288,  # Right jaw
-        ]
-
-        all_points = np.array(
-            [(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32
-        )
-        anchor = all_points[4]
-        all_points_centered = all_points - anchor
+        landmarks = results.multi_face_landmarks[0].landmark
+        features, EAR = self.features_from_landmarks(landmarks)
+        return features.copy(), EAR < BLINK_EAR_THRESHOLD
 
-        left_corner = all_points[33]
-        right_corner = all_points[263]
-        inter_eye_dist = np.linalg.norm(right_corner - left_corner)
-        if inter_eye_dist > 1e-7:
-            all_points_centered /= inter_eye_dist
+    def features_from_landmarks(self, landmarks):
+        """
+        Builds the eye-region feature vector and eye aspect ratio from an
+        already computed set of refined FaceMesh landmarks
+        """
+        points = self.landmarks_to_points(landmarks)
+        return self.features_from_points(points)
 
-        subset_indices = left_eye_indices + right_eye_indices + mutual_indices
-        eye_landmarks = all_points_centered[subset_indices]
-        features = eye_landmarks.flatten()
+    def landmarks_to_points(self, landmarks):
+        """
+        Copies FaceMesh landmarks into the preallocated (478, 3) buffer, in
+        place. They have to come from a FaceMesh with refine_landmarks, the
+        features need the iris points
+        """
+        if len(landmarks) != NUM_LANDMARKS:
+            raise ValueError(f"Expected {NUM_LANDMARKS} refined FaceMesh landmarks, got {len(landmarks)}")
+        view = self._points_view
+        i = 0
+        for lm in landmarks:
+            view[i] = lm.x
+            view[i + 1] = lm.y
+            view[i + 2] = lm.z
+            i += 3
+        return self._points
 
-        # Blink detection
-        left_eye_inner = np.array([landmarks[133].x, landmarks[133].y])
-        left_eye_outer = np.array([landmarks[33].x, landmarks[33].y])
-        left_eye_top = np.array([landmarks[159].x, landmarks[159].y])
-        left_eye_bottom = np.array([landmarks[145].x, landmarks[145].y])
+    def load_points(self, points):
+        """
+        Copies already known full-frame landmarks, such as recorded ones,
+        into the same buffer
+        """
+        np.copyto(self._points, points)
+        return self._points
 
-        right_eye_inner = np.array([landmarks[362].x, landmarks[362].y])
-        right_eye_outer = np.array([landmarks[263].x, landmarks[263].y])
-        right_eye_top = np.array([landmarks[386].x, landmarks[386].y])
-        right_eye_bottom = np.array([landmarks[374].x, landmarks[374].y])
+    @property
+    def points(self):
+        """
+        The (478, 3) buffer the last landmarks were copied into. It is
+        reused on every frame; copy it to keep it
+        """
+        return self._points
 
-        left_eye_width = np.linalg.norm(left_eye_outer - left_eye_inner)
-        left_eye_height = np.linalg.norm(left_eye_top - left_eye_bottom)
-        left_EAR = left_eye_height / (left_eye_width + 1e-8)
+    def features_from_points(self, points):
+        """
+        Vectorized feature and EAR computation on a (478, 3) landmark array.
+        The returned feature vector is a reused buffer, copy it to keep it
+        """
+        features = self._features
+        np.take(points, self.subset_indices, axis=0, out=features)
+        features -= points[NOSE_ANCHOR_INDEX]
 
-        right_eye_width = np.linalg.norm(right_eye_outer - right_eye_inner)
-        right_eye_height = np.linalg.norm(right_eye_top - right_eye_bottom)
-        right_EAR = right_eye_height / (right_eye_width + 1e-8)
+        np.subtract(points[RIGHT_EYE_CORNER_INDEX], points[LEFT_EYE_CORNER_INDEX], out=self._corner_delta)
+        inter_eye_dist = np.sqrt(np.dot(self._corner_delta, self._corner_delta))
+        if inter_eye_dist > 1e-7:
+            features /= inter_eye_dist
 
-        EAR = (left_EAR + right_EAR) / 2
-        blink_threshold = 0.2
-        blink_detected = EAR < blink_threshold
+        # Blink detection: rows are (top, outer, bottom, inner) per eye so one
+        # subtraction yields each eye's vertical and horizontal extent
+        np.take(points[:, :2], self.ear_indices, axis=0, out=self._ear_points)
+        np.subtract(self._ear_points[:, :2], self._ear_points[:, 2:], out=self._ear_vectors)
+        np.hypot(self._ear_vectors[..., 0], self._ear_vectors[..., 1], out=self._ear_lengths)
+        lengths = self._ear_lengths
+        left_EAR = lengths[0, 0] / (lengths[0, 1] + 1e-8)
+        right_EAR = lengths[1, 0] / (lengths[1, 1] + 1e-8)
+        EAR = float(left_EAR + right_EAR) / 2
 
-        return features, blink_detected
+        return self._features_flat, EAR
 
     def train(self, X, y, alpha=1.0, variable_scaling=None):
         """
         Trains gaze prediction model
         """
+        # sklearn is only needed here, keep it off the startup path
+        from sklearn.linear_model import Ridge
+        from sklearn.preprocessing import StandardScaler
+
+        self.scaler = StandardScaler()
         self.variable_scaling = variable_scaling
 
         X_scaled = self.scaler.fit_transform(X)
@@ -272,16 +354,62 @@ class GazeEstimator:
 
         self.model = Ridge(alpha=alpha)
         self.model.fit(X_scaled, y)
+        self.scaler_mean = self.scaler.mean_.astype(np.float64)
+        self.scaler_scale = self.scaler.scale_.astype(np.float64)
 
-    def predict(self, X):
+        # Seed the incremental solver with the batch solution: P is the
+        # inverse of the regularized normal matrix, intercept unpenalized
+        self._single_output = self.model.coef_.ndim == 1
+        coef = np.atleast_2d(self.model.coef_)
+        self._theta = np.vstack([coef.T, np.atleast_1d(self.model.intercept_)[None, :]]).astype(np.float64)
+        Z = np.hstack([X_scaled, np.ones((X_scaled.shape[0], 1))])
+        penalty = np.full(Z.shape[1], float(alpha))
+        penalty[-1] = 0.0
+        self._P = np.linalg.inv(Z.T @ Z + np.diag(penalty))
+        self._compile()
+
+    def _compile(self):
         """
-        Predicts gaze location
+        Folds the scaler and variable scaling into the model weights
         """
-        if self.model is None:
+        factor = 1.0 / self.scaler_scale
+        if self.variable_scaling is not None:
+            factor = factor * self.variable_scaling
+        coef = self._theta[:-1]
+        self.weights = coef * factor[:, None]
+        self.bias = self._theta[-1] - (self.scaler_mean * factor) @ coef
+
+    def update(self, x, y, forgetting=1.0):
+        """
+        Adds one calibration sample to the trained model with a recursive
+        least squares step instead of refitting. forgetting below 1 weights
+        recent samples more. The scaler keeps its trained statistics
+        """
+        if self.weights is None:
             raise Exception("Model is not trained yet.")
+        if self._P is None:
+            raise Exception("Model was loaded without update state, retrain it to update.")
 
-        X_scaled = self.scaler.transform(X)
+        z = (np.asarray(x, dtype=np.float64).reshape(-1) - self.scaler_mean) / self.scaler_scale
         if self.variable_scaling is not None:
-            X_scaled *= self.variable_scaling
+            z *= self.variable_scaling
+        z = np.append(z, 1.0)
+
+        Pz = self._P @ z
+        gain = Pz / (forgetting + z @ Pz)
+        error = np.atleast_1d(y).astype(np.float64) - z @ self._theta
+        self._theta += np.outer(gain, error)
+        self._P -= np.outer(gain, Pz)
+        if forgetting != 1.0:
+            self._P /= forgetting
+        self._compile()
+
+    def predict(self, X):
+        """
+        Predicts gaze location
+        """
+        if self.weights is None:
+            raise Exception("Model is not trained yet.")
 
-        return self.model.predict(X_scaled)
+        prediction = np.asarray(X) @ self.weights + self.bias
+        return prediction[..., 0] if self._single_output else prediction
@@ -0,0 +1,93 @@
+import struct
+import zlib
+
+import numpy as np
+
+from core.gaze_estimator import GazeEstimator
+
+# A saved model is one little-endian file: a fixed header, then float64
+# arrays back to back. The CRC32 covers everything after the header
+MAGIC = b"NHGZ"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+
+FLAG_SINGLE_OUTPUT = 1
+FLAG_VARIABLE_SCALING = 2
+FLAG_UPDATE_STATE = 4
+
+
+def save_gaze_model(estimator, path, include_update_state=False):
+    """
+    Writes the folded weights and scaler statistics of a trained estimator.
+    With include_update_state the RLS state is saved too, so the loaded
+    model can keep taking update() calls; it grows the file with the square
+    of the feature count
+    """
+    if estimator.weights is None:
+        raise Exception("Model is not trained yet.")
+
+    num_features, num_outputs = estimator.weights.shape
+    flags = 0
+    arrays = [estimator.weights, estimator.bias, estimator.scaler_mean, estimator.scaler_scale]
+    if estimator._single_output:
+        flags |= FLAG_SINGLE_OUTPUT
+    if estimator.variable_scaling is not None:
+        flags |= FLAG_VARIABLE_SCALING
+        arrays.append(np.broadcast_to(estimator.variable_scaling, (num_features,)))
+    if include_update_state:
+        flags |= FLAG_UPDATE_STATE
+        arrays += [estimator._theta, estimator._P]
+
+    payload = b"".join(np.ascontiguousarray(a, dtype="<f8").tobytes() for a in arrays)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags, num_features, num_outputs, zlib.crc32(payload)))
+        f.write(payload)
+
+
+def load_gaze_model(path, face_mesh=None):
+    """
+    Returns a GazeEstimator ready to predict from a file written by
+    save_gaze_model. Does not import sklearn
+    """
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is too short to be a gaze model")
+    magic, version, flags, num_features, num_outputs, checksum = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a gaze model")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported gaze model version {version}")
+
+    payload = memoryview(data)[HEADER.size:]
+    if zlib.crc32(payload) != checksum:
+        raise ValueError(f"{path} is corrupted (checksum mismatch)")
+
+    shapes = [(num_features, num_outputs), (num_outputs,), (num_features,), (num_features,)]
+    if flags & FLAG_VARIABLE_SCALING:
+        shapes.append((num_features,))
+    if flags & FLAG_UPDATE_STATE:
+        shapes += [(num_features + 1, num_outputs), (num_features + 1, num_features + 1)]
+
+    expected = sum(int(np.prod(shape)) for shape in shapes) * 8
+    if len(payload) != expected:
+        raise ValueError(f"{path} has {len(payload)} payload bytes, expected {expected}")
+
+    # Views into the one buffer read from disk, no per-array copies
+    arrays = []
+    offset = 0
+    for shape in shapes:
+        count = int(np.prod(shape))
+        arrays.append(np.frombuffer(payload, dtype="<f8", count=count, offset=offset).reshape(shape))
+        offset += count * 8
+
+    estimator = GazeEstimator(face_mesh=face_mesh)
+    estimator.weights, estimator.bias, estimator.scaler_mean, estimator.scaler_scale = arrays[:4]
+    rest = arrays[4:]
+    if flags & FLAG_VARIABLE_SCALING:
+        estimator.variable_scaling = rest.pop(0)
+    if flags & FLAG_UPDATE_STATE:
+        estimator._theta, estimator._P = rest
+    estimator._single_output = bool(flags & FLAG_SINGLE_OUTPUT)
+    return estimator
@@ -0,0 +1,245 @@
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.capture import CapturedFrame
+from core.gaze_estimator import NUM_LANDMARKS
+
+# Per slot header, float64: sequence written before the slot's data,
+# sequence written after it, capture timestamp, 1.0 when a face was found
+SEQ_BEGIN, SEQ_END, TIMESTAMP, FACE_FOUND = range(4)
+HEADER_FIELDS = 4
+# Shared counters, int64: latest complete sequence, frames captured, frames
+# dropped by the camera thread, 1 while the worker is running
+LATEST, CAPTURED, DROPPED, RUNNING = range(4)
+NUM_COUNTERS = 4
+
+
+class ResultRing:
+    """
+    Views over one shared memory block laid out as counters, then per slot a
+    header, the landmarks and the raw camera frame. The worker writes slot
+    sequence % slots and then publishes the sequence; readers copy a slot
+    and retry if its begin and end sequences show it was rewritten meanwhile
+    """
+
+    def __init__(self, buffer, frame_shape, slots):
+        self.slots = slots
+        self.frame_shape = tuple(frame_shape)
+
+        offset = 0
+        self.counters = np.ndarray((NUM_COUNTERS,), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += self.counters.nbytes
+        self.headers = np.ndarray((slots, HEADER_FIELDS), dtype=np.float64, buffer=buffer, offset=offset)
+        offset += self.headers.nbytes
+        self.points = np.ndarray((slots, NUM_LANDMARKS, 3), dtype=np.float32, buffer=buffer, offset=offset)
+        offset += self.points.nbytes
+        self.frames = np.ndarray((slots,) + self.frame_shape, dtype=np.uint8, buffer=buffer, offset=offset)
+
+    @staticmethod
+    def size(frame_shape, slots):
+        return (NUM_COUNTERS * 8 + slots * HEADER_FIELDS * 8 + slots * NUM_LANDMARKS * 3 * 4
+                + slots * int(np.prod(frame_shape)))
+
+    def write(self, sequence, timestamp, frame, points):
+        slot = sequence % self.slots
+        header = self.headers[slot]
+        header[SEQ_BEGIN] = sequence
+        header[TIMESTAMP] = timestamp
+        header[FACE_FOUND] = points is not None
+        if points is not None:
+            self.points[slot] = points
+        self.frames[slot] = frame
+        header[SEQ_END] = sequence
+        self.counters[LATEST] = sequence
+
+    def release_views(self):
+        # SharedMemory.close() refuses while numpy views still point into it
+        self.counters = self.headers = self.points = self.frames = None
+
+
+def apply_controls(control, tracker):
+    """
+    Applies the settings the UI process sent since the last frame
+    """
+    while True:
+        try:
+            close_ear, open_ear = control.get_nowait()
+        except queue.Empty:
+            return
+        tracker.blink.set_thresholds(close_ear, open_ear)
+
+
+def _worker_main(conn, stop_event, control, camera_source, slots, tracker_options):
+    """
+    Worker process: captures frames, runs FaceMesh on the newest one and
+    publishes landmarks and the frame into the ring the UI process created
+    """
+    import cv2
+    from core.capture import CameraCapture
+    from core.tracker import FaceTracker
+
+    camera = CameraCapture(camera_source)
+    first = camera.read(timeout=5.0)
+    if first is None:
+        conn.send(None)
+        camera.release()
+        return
+
+    conn.send(first.frame.shape)
+    memory = shared_memory.SharedMemory(name=conn.recv())
+    ring = ResultRing(memory.buf, first.frame.shape, slots)
+    tracker = FaceTracker(**tracker_options)
+    ring.counters[RUNNING] = 1
+
+    captured = first
+    try:
+        while captured is not None and not stop_event.is_set():
+            apply_controls(control, tracker)
+            tracking = tracker.process(cv2.flip(captured.frame, 1), captured.timestamp)
+            ring.write(captured.sequence, captured.timestamp, captured.frame, tracking.points)
+            stats = camera.stats()
+            ring.counters[CAPTURED] = stats["captured"]
+            ring.counters[DROPPED] = stats["dropped"]
+            while not stop_event.is_set():
+                captured = camera.read()
+                if captured is not None or not camera.is_opened():
+                    break
+    finally:
+        ring.counters[RUNNING] = 0
+        ring.release_views()
+        memory.close()
+        camera.release()
+        tracker.close()
+
+
+class InferenceWorker:
+    """
+    Runs the camera and FaceMesh inference in a separate process, so a slow
+    inference never holds up the frame loop and inference gets its own core.
+
+    Results come back through a shared memory ring: read() hands out the
+    newest landmarks (copied, a few KB) with the raw frame as a view into
+    the ring, which stays valid until the worker wraps around to its slot
+    again. Timestamps are time.perf_counter() readings from the worker,
+    which share the system-wide monotonic clock with this process.
+
+    It reads like a landmark-only replay, so the App runs
+    FaceTracker.process_points on the results. tracker_options are the
+    FaceTracker keyword arguments used in the worker.
+    """
+
+    landmarks_only = True
+
+    def __init__(self, camera_source=0, slots=4, tracker_options=None, start_timeout=30.0):
+        context = multiprocessing.get_context("spawn")
+        self.slots = slots
+        self._stop = context.Event()
+        # Blink thresholds changed by calibration, (close_ear, open_ear)
+        self._control = context.Queue()
+        conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_worker_main,
+            args=(child_conn, self._stop, self._control, camera_source, slots, tracker_options or {}),
+            daemon=True,
+            name="inference-worker",
+        )
+        self._process.start()
+
+        self._memory = None
+        self.ring = None
+        self._last_read_sequence = -1
+        self._points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        # mediapipe loads in the worker, so the first frame can take a while
+        deadline = time.perf_counter() + start_timeout
+        while not conn.poll(0.1):
+            if not self._process.is_alive():
+                raise RuntimeError(f"Inference worker exited during startup (exit code {self._process.exitcode})")
+            if time.perf_counter() > deadline:
+                self._process.terminate()
+                raise RuntimeError("Inference worker did not start in time")
+        frame_shape = conn.recv()
+        if frame_shape is None:
+            self._process.join()
+            print("⚠️ Inference worker could not open the camera")
+            return
+
+        # This process owns the block: it creates it here and unlinks it in
+        # release(); the worker only attaches
+        self._memory = shared_memory.SharedMemory(create=True, size=ResultRing.size(frame_shape, slots))
+        self.ring = ResultRing(self._memory.buf, frame_shape, slots)
+        self.ring.counters[:] = 0
+        self.ring.counters[LATEST] = -1
+        self.ring.headers[:] = -1
+        conn.send(self._memory.name)
+
+    def is_opened(self):
+        if self.ring is None:
+            return False
+        running = self.ring.counters[RUNNING] == 1 or self._process.is_alive()
+        return running or self.ring.counters[LATEST] > self._last_read_sequence
+
+    def read(self, timeout=1.0):
+        """
+        Returns a CapturedFrame for the newest result not yet handed out,
+        with points set to its landmarks or None without a face. Waits up
+        to timeout seconds and returns None when nothing new arrived
+        """
+        if self.ring is None:
+            return None
+        deadline = time.perf_counter() + timeout
+        while True:
+            sequence = int(self.ring.counters[LATEST])
+            if sequence > self._last_read_sequence:
+                captured = self._copy_slot(sequence)
+                if captured is not None:
+                    self._last_read_sequence = captured.sequence
+                    return captured
+                # The worker lapped this slot while it was being read
+                continue
+            if time.perf_counter() >= deadline or not self._process.is_alive():
+                return None
+            time.sleep(0.001)
+
+    def _copy_slot(self, sequence):
+        slot = sequence % self.slots
+        header = self.ring.headers[slot]
+        if header[SEQ_END] != sequence:
+            return None
+        timestamp = float(header[TIMESTAMP])
+        face_found = header[FACE_FOUND] == 1.0
+        np.copyto(self._points, self.ring.points[slot])
+        if header[SEQ_BEGIN] != sequence:
+            return None
+        return CapturedFrame(self.ring.frames[slot], timestamp, sequence, self._points if face_found else None)
+
+    def set_blink_thresholds(self, close_ear, open_ear):
+        """
+        Hands new blink thresholds to the worker's tracker, which uses them
+        to decide when a blink may be starting
+        """
+        self._control.put((close_ear, open_ear))
+
+    def stats(self):
+        if self.ring is None:
+            return {"captured": 0, "dropped": 0}
+        return {
+            "captured": int(self.ring.counters[CAPTURED]),
+            "dropped": int(self.ring.counters[DROPPED]),
+        }
+
+    def release(self):
+        self._stop.set()
+        self._process.join(timeout=2.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._control.close()
+        if self._memory is not None:
+            self.ring.release_views()
+            self.ring = None
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
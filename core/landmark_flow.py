@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+
+from core.gaze_estimator import NOSE_ANCHOR_INDEX
+
+NOSE_TIP_INDEX = 1
+# FaceMesh eye contours, eyelid corners and lids included
+LEFT_EYE_CONTOUR = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
+RIGHT_EYE_CONTOUR = [263, 249, 390, 373, 374, 380, 381, 382, 362, 398, 384, 385, 386, 387, 388, 466]
+# Refined iris rings, center first. Gaze features measure them against the
+# eye corners, so they need their own flow rather than the median shift
+LEFT_IRIS = [468, 469, 470, 471, 472]
+RIGHT_IRIS = [473, 474, 475, 476, 477]
+FLOW_INDICES = [NOSE_TIP_INDEX, NOSE_ANCHOR_INDEX] + LEFT_EYE_CONTOUR + RIGHT_EYE_CONTOUR + LEFT_IRIS + RIGHT_IRIS
+
+
+class LandmarkFlow:
+    """
+    Carries FaceMesh landmarks from one grayscale frame to the next with
+    pyramidal Lucas-Kanade optical flow, so the mesh does not have to run on
+    every frame.
+
+    Only the nose tip, eye contours and irises are tracked, and only inside
+    a padded box around them; the other landmarks move by the median flow
+    of those, which keeps the whole (478, 3) array usable for features.
+    Each point is also tracked back to the previous frame and only trusted
+    if it lands within max_error_px of where it started.
+    quality is the fraction of trusted points on the last track() and
+    motion_px the median movement in pixels.
+    """
+
+    def __init__(self, indices=FLOW_INDICES, min_quality=0.8, max_error_px=1.0, win_size=15, max_level=2, padding_px=32):
+        self.indices = np.asarray(indices, dtype=np.intp)
+        self.min_quality = min_quality
+        self.max_error_px = max_error_px
+        self.padding_px = padding_px
+        self.lk_params = dict(
+            winSize=(win_size, win_size),
+            maxLevel=max_level,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        )
+        self.previous = None
+        self._pixels = None
+        self._frame_size = None
+        self.quality = 0.0
+        self.motion_px = 0.0
+
+    @property
+    def active(self):
+        return self.previous is not None
+
+    def reset(self, gray, points):
+        """
+        Starts following points, full-frame normalized landmarks found in
+        gray
+        """
+        height, width = gray.shape[:2]
+        self._frame_size = np.array([width, height], dtype=np.float32)
+        self._pixels = (points[self.indices, :2] * self._frame_size).reshape(-1, 1, 2).astype(np.float32)
+        self.previous = gray
+
+    def clear(self):
+        self.previous = None
+        self._pixels = None
+
+    def track(self, gray, points):
+        """
+        Moves points, the landmarks of the previous frame, to where they are
+        in gray, in place. Returns False and leaves points alone when fewer
+        than min_quality of the tracked points could be trusted
+        """
+        # Building the image pyramids is most of the cost, so both frames
+        # are cropped to the same box around the points
+        start = self._pixels.reshape(-1, 2)
+        height, width = gray.shape[:2]
+        x0, y0 = np.maximum(np.floor(start.min(axis=0)).astype(int) - self.padding_px, 0)
+        x1, y1 = np.minimum(np.ceil(start.max(axis=0)).astype(int) + self.padding_px + 1, (width, height))
+        origin = np.array([x0, y0], dtype=np.float32)
+        previous, current = self.previous[y0:y1, x0:x1], gray[y0:y1, x0:x1]
+
+        local = (self._pixels - origin).astype(np.float32)
+        forward, status, _ = cv2.calcOpticalFlowPyrLK(previous, current, local, None, **self.lk_params)
+        backward, back_status, _ = cv2.calcOpticalFlowPyrLK(current, previous, forward, None, **self.lk_params)
+
+        forward = forward.reshape(-1, 2) + origin
+        error = np.linalg.norm(backward.reshape(-1, 2) - local.reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error <= self.max_error_px)
+        self.quality = np.count_nonzero(good) / len(good)
+        if self.quality < self.min_quality or not good.any():
+            return False
+
+        shift = np.median(forward[good] - start[good], axis=0)
+        self.motion_px = float(np.hypot(shift[0], shift[1]))
+        # Untrusted points follow the rest of the face
+        forward[~good] = start[~good] + shift
+
+        points[:, :2] += shift / self._frame_size
+        points[self.indices, :2] = forward / self._frame_size
+        self._pixels = forward.reshape(-1, 1, 2)
+        self.previous = gray
+        return True
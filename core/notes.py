@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class NoteEngine:
+    """
+    Falling notes stored as parallel NumPy arrays (column, spawn time, hit
+    flag) ordered by spawn time. A note's height is derived from time,
+    y = (now - spawn_time) * speed, so motion does not depend on the frame
+    rate.
+
+    Because every note falls at the same speed, y is monotonic in spawn
+    time: the hit window, the visible range and the notes that have fallen
+    off screen are contiguous index ranges found with np.searchsorted, and
+    everything inside them is handled with array operations.
+    """
+
+    def __init__(self, speed, hit_zone, cull_y, capacity=256):
+        self.speed = float(speed)
+        self.hit_top, self.hit_bottom = hit_zone
+        self.cull_y = cull_y
+
+        self.columns = np.zeros(capacity, dtype=np.int16)
+        self.spawn_times = np.zeros(capacity, dtype=np.float64)
+        self.hit = np.zeros(capacity, dtype=bool)
+        # Live notes are [head, tail); culling advances head
+        self.head = 0
+        self.tail = 0
+
+    def clear(self):
+        self.head = 0
+        self.tail = 0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def spawn(self, column, spawn_time):
+        """
+        Adds a note that is at y = 0 at spawn_time. Spawn times must not
+        decrease
+        """
+        if self.tail == len(self.spawn_times):
+            self._make_room(1)
+        self.columns[self.tail] = column
+        self.spawn_times[self.tail] = spawn_time
+        self.hit[self.tail] = False
+        self.tail += 1
+
+    def spawn_many(self, columns, spawn_times):
+        count = len(spawn_times)
+        if self.tail + count > len(self.spawn_times):
+            self._make_room(count)
+        self.columns[self.tail:self.tail + count] = columns
+        self.spawn_times[self.tail:self.tail + count] = spawn_times
+        self.hit[self.tail:self.tail + count] = False
+        self.tail += count
+
+    def _make_room(self, count):
+        live = self.tail - self.head
+        capacity = len(self.spawn_times)
+        if live + count > capacity // 2:
+            while live + count > capacity // 2:
+                capacity *= 2
+            for name in ("columns", "spawn_times", "hit"):
+                old = getattr(self, name)
+                new = np.zeros(capacity, dtype=old.dtype)
+                new[:live] = old[self.head:self.tail]
+                setattr(self, name, new)
+        else:
+            # Slide live notes back to the start instead of growing
+            for array in (self.columns, self.spawn_times, self.hit):
+                array[:live] = array[self.head:self.tail]
+        self.head = 0
+        self.tail = live
+
+    def _range(self, now, y_top, y_bottom):
+        """
+        Index range of live notes with y_top <= y <= y_bottom at now
+        """
+        times = self.spawn_times[self.head:self.tail]
+        lo = np.searchsorted(times, now - y_bottom / self.speed, side="left")
+        hi = np.searchsorted(times, now - y_top / self.speed, side="right")
+        return self.head + lo, self.head + hi
+
+    def update(self, now):
+        """
+        Drops notes that have fallen past cull_y and returns how many of
+        them were never hit
+        """
+        times = self.spawn_times[self.head:self.tail]
+        culled = np.searchsorted(times, now - self.cull_y / self.speed, side="left")
+        missed = int(culled - np.count_nonzero(self.hit[self.head:self.head + culled]))
+        self.head += culled
+        return missed
+
+    def try_hit(self, column, now):
+        """
+        Marks the lowest unhit note of column inside the hit zone as hit.
+        Returns its spawn time, or None when there was no note to hit
+        """
+        lo, hi = self._range(now, self.hit_top, self.hit_bottom)
+        candidates = (self.columns[lo:hi] == column) & ~self.hit[lo:hi]
+        if not candidates.any():
+            return None
+        # Earliest spawn is lowest on screen
+        index = lo + int(np.argmax(candidates))
+        self.hit[index] = True
+        return float(self.spawn_times[index])
+
+    def visible(self, now):
+        """
+        Columns and y positions of the unhit notes currently on screen
+        """
+        lo, hi = self._range(now, 0, self.cull_y)
+        keep = ~self.hit[lo:hi]
+        ys = ((now - self.spawn_times[lo:hi][keep]) * self.speed).astype(np.intp)
+        return self.columns[lo:hi][keep], ys
@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from core.capture import CapturedFrame
+from core.gaze_estimator import NUM_LANDMARKS
+
+# A recording is a directory of flat little-endian binaries plus meta.json,
+# so every stream can be opened with np.memmap without loading it
+META_FILE = "meta.json"
+TIMESTAMPS_FILE = "timestamps.f64"
+LANDMARKS_FILE = "landmarks.f32"
+FRAMES_FILE = "frames.u8"
+FORMAT_VERSION = 1
+
+
+class SessionRecorder:
+    """
+    Appends capture timestamps, per-frame landmarks (NaN when no face was
+    found) and optionally the raw camera frames to a recording directory
+    """
+
+    def __init__(self, path, record_frames=False):
+        self.path = path
+        self.record_frames = record_frames
+        os.makedirs(path, exist_ok=True)
+
+        self._timestamps = open(os.path.join(path, TIMESTAMPS_FILE), "wb")
+        self._landmarks = open(os.path.join(path, LANDMARKS_FILE), "wb")
+        self._frames = open(os.path.join(path, FRAMES_FILE), "wb") if record_frames else None
+        self._no_face = np.full((NUM_LANDMARKS, 3), np.nan, dtype="<f4")
+        self.frame_shape = None
+        self.count = 0
+
+    def write(self, captured, tracking):
+        self._timestamps.write(np.asarray(captured.timestamp, dtype="<f8").tobytes())
+
+        points = tracking.points if tracking.face_found else self._no_face
+        self._landmarks.write(np.ascontiguousarray(points, dtype="<f4").tobytes())
+
+        if self.frame_shape is None:
+            self.frame_shape = captured.frame.shape
+        if self._frames is not None:
+            self._frames.write(np.ascontiguousarray(captured.frame).tobytes())
+        self.count += 1
+
+    def close(self):
+        for stream in (self._timestamps, self._landmarks, self._frames):
+            if stream is not None:
+                stream.close()
+
+        meta = {
+            "version": FORMAT_VERSION,
+            "count": self.count,
+            "num_landmarks": NUM_LANDMARKS,
+            "frame_shape": list(self.frame_shape) if self.frame_shape else None,
+            "has_frames": self.record_frames,
+        }
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+        print(f"💾 Recorded {self.count} frames to {self.path}")
+
+
+class Recording:
+    """
+    Memory-mapped read access to a recording directory
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE), "r") as f:
+            self.meta = json.load(f)
+        if self.meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version {self.meta['version']}")
+
+        self.count = self.meta["count"]
+        self.frame_shape = tuple(self.meta["frame_shape"]) if self.meta["frame_shape"] else None
+        self.timestamps = self._map(path, TIMESTAMPS_FILE, "<f8", ())
+        self.landmarks = self._map(path, LANDMARKS_FILE, "<f4", (self.meta["num_landmarks"], 3))
+        self.frames = None
+        if self.meta["has_frames"]:
+            # An empty session never saw a frame, so it has no shape either
+            self.frames = self._map(path, FRAMES_FILE, np.uint8, self.frame_shape or (0, 0, 3))
+
+    def _map(self, path, name, dtype, item_shape):
+        shape = (self.count,) + tuple(item_shape)
+        # np.memmap cannot map an empty file
+        if self.count == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(path, name), dtype=dtype, mode="r", shape=shape)
+
+    def points(self, index):
+        """
+        Recorded landmarks for a frame, or None if no face was found
+        """
+        points = self.landmarks[index]
+        if np.isnan(points[0, 0]):
+            return None
+        return points
+
+
+class ReplaySource:
+    """
+    Drop-in replacement for CameraCapture that plays a recording back,
+    either paced by the recorded timestamps or as fast as possible.
+
+    Recordings with frames are fed through the tracker like live input;
+    landmark-only recordings hand over the recorded landmarks on each
+    CapturedFrame so inference is skipped.
+    """
+
+    def __init__(self, path, realtime=True, loop=False):
+        self.recording = Recording(path)
+        self.realtime = realtime
+        self.loop = loop
+        self.landmarks_only = self.recording.frames is None
+        self._index = 0
+        self._sequence = 0
+        self._start = None
+        self._opened = self.recording.count > 0
+        self._lock = threading.Lock()
+        self.frames_captured = 0
+        self.frames_dropped = 0
+
+        shape = self.recording.frame_shape or (480, 640, 3)
+        self._blank = np.zeros(shape, dtype=np.uint8)
+
+    def is_opened(self):
+        return self._opened
+
+    def read(self, timeout=1.0):
+        with self._lock:
+            if not self._opened:
+                return None
+
+            recording = self.recording
+            if self._index >= recording.count:
+                if not self.loop:
+                    self._opened = False
+                    return None
+                self._index = 0
+                self._start = None
+
+            recorded_time = recording.timestamps[self._index] - recording.timestamps[0]
+            now = time.perf_counter()
+            if self._start is None:
+                self._start = now - recorded_time
+
+            if self.realtime:
+                delay = self._start + recorded_time - now
+                if delay > 0:
+                    time.sleep(delay)
+                # Like the live camera, skip frames the consumer was too slow for
+                elapsed = time.perf_counter() - self._start
+                while self._index + 1 < recording.count and recording.timestamps[self._index + 1] - recording.timestamps[0] <= elapsed:
+                    self._index += 1
+                    self.frames_dropped += 1
+                recorded_time = recording.timestamps[self._index] - recording.timestamps[0]
+
+            index = self._index
+            frame = self._blank if self.landmarks_only else np.array(recording.frames[index])
+            points = recording.points(index) if self.landmarks_only else None
+            captured = CapturedFrame(frame, self._start + recorded_time, self._sequence, points)
+
+            self._index += 1
+            self._sequence += 1
+            self.frames_captured += 1
+            return captured
+
+    def stats(self):
+        return {
+            "captured": self.frames_captured,
+            "dropped": self.frames_dropped,
+        }
+
+    def release(self):
+        self._opened = False
@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+
+class TextSprite:
+    """
+    Text rendered once with cv2.putText into a small image plus mask
+    """
+
+    def __init__(self, text, font_scale, color, thickness, font=cv2.FONT_HERSHEY_SIMPLEX):
+        (text_w, text_h), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+        pad = thickness
+        self.width = text_w + 2 * pad
+        self.height = text_h + baseline + 2 * pad
+        # Offset from the putText origin (bottom-left of the text) to the
+        # sprite's top-left corner
+        self.offset_x = -pad
+        self.offset_y = -(text_h + pad)
+
+        self.image = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        cv2.putText(self.image, text, (pad, text_h + pad), font, font_scale, color, thickness)
+        # Drawn separately so dark text, which matches the empty image, is
+        # still covered
+        glyphs = np.zeros((self.height, self.width), dtype=np.uint8)
+        cv2.putText(glyphs, text, (pad, text_h + pad), font, font_scale, 255, thickness)
+        self.mask = glyphs.astype(bool)
+
+    def blit(self, canvas, org):
+        """
+        Draws the sprite so it lands where cv2.putText(canvas, text, org, ...)
+        would have drawn it. Returns the clipped rectangle that was touched
+        """
+        x0 = org[0] + self.offset_x
+        y0 = org[1] + self.offset_y
+        canvas_h, canvas_w = canvas.shape[:2]
+        cx0, cy0 = max(0, x0), max(0, y0)
+        cx1, cy1 = min(canvas_w, x0 + self.width), min(canvas_h, y0 + self.height)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return None
+
+        sx0, sy0 = cx0 - x0, cy0 - y0
+        sx1, sy1 = sx0 + (cx1 - cx0), sy0 + (cy1 - cy0)
+        np.copyto(
+            canvas[cy0:cy1, cx0:cx1],
+            self.image[sy0:sy1, sx0:sx1],
+            where=self.mask[sy0:sy1, sx0:sx1, None],
+        )
+        return cx0, cy0, cx1, cy1
+
+
+@lru_cache(maxsize=256)
+def text_sprite(text, font_scale, color, thickness):
+    return TextSprite(text, font_scale, color, thickness)
+
+
+def draw_text(canvas, text, org, font_scale, color, thickness):
+    """
+    Cached equivalent of cv2.putText with FONT_HERSHEY_SIMPLEX
+    """
+    return text_sprite(text, font_scale, tuple(color), thickness).blit(canvas, org)
+
+
+@lru_cache(maxsize=32)
+def disk_half_widths(radius):
+    """
+    For each row dy in -radius..radius of a filled cv2.circle, how many
+    pixels it extends left and right of the center column
+    """
+    patch = np.zeros((2 * radius + 1, 2 * radius + 1), dtype=np.uint8)
+    cv2.circle(patch, (radius, radius), radius, 1, -1)
+    return (np.count_nonzero(patch, axis=1) - 1) // 2
+
+
+@lru_cache(maxsize=8)
+def solid_patch(height, width, color):
+    patch = np.empty((height, width, 3), dtype=np.uint8)
+    patch[:] = color
+    return patch
+
+
+class LayerCache:
+    """
+    Pre-rendered static layers keyed by the UI state they depend on. A layer
+    is drawn once by draw_fn(canvas, key) and reused until its key changes;
+    the most recently used layers are kept up to max_bytes (the newest
+    always is), so a 4K screen keeps fewer variants than a 1080p one
+    """
+
+    def __init__(self, width, height, draw_fn, max_bytes=64 * 1024 * 1024):
+        self.width = width
+        self.height = height
+        self.draw_fn = draw_fn
+        self.max_bytes = max_bytes
+        self._layers = OrderedDict()
+        self.cached_bytes = 0
+
+    def get(self, key):
+        layer = self._layers.get(key)
+        if layer is None:
+            layer = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+            self.draw_fn(layer, key)
+            layer.flags.writeable = False
+            self._layers[key] = layer
+            self.cached_bytes += layer.nbytes
+            while self.cached_bytes > self.max_bytes and len(self._layers) > 1:
+                _, evicted = self._layers.popitem(last=False)
+                self.cached_bytes -= evicted.nbytes
+        else:
+            self._layers.move_to_end(key)
+        return layer
+
+    def invalidate(self):
+        self._layers.clear()
+        self.cached_bytes = 0
+
+
+class Compositor:
+    """
+    Composites dynamic elements over a cached background into one reused
+    frame buffer. Only the regions drawn on the previous frame are restored
+    from the background, unless the background itself changed
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self._background = None
+        self._dirty = []
+        # Regions restored by begin(), None when the whole frame was
+        self._restored = None
+
+    def begin(self, background):
+        if background is not self._background:
+            np.copyto(self.frame, background)
+            self._background = background
+            self._restored = None
+        else:
+            for x0, y0, x1, y1 in self._dirty:
+                self.frame[y0:y1, x0:x1] = background[y0:y1, x0:x1]
+            self._restored = self._dirty
+        self._dirty = []
+        return self.frame
+
+    def damage(self):
+        """
+        Rects of the frame that changed since the previous frame, or None
+        when all of it may have
+        """
+        if self._restored is None:
+            return None
+        return self._restored + self._dirty
+
+    def mark_dirty(self, x0, y0, x1, y1):
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1, y1 = min(self.width, int(x1)), min(self.height, int(y1))
+        if x0 < x1 and y0 < y1:
+            self._dirty.append((x0, y0, x1, y1))
+
+    def circle(self, center, radius, color, thickness=-1):
+        cv2.circle(self.frame, center, radius, color, thickness)
+        extent = radius + max(thickness, 0) + 1
+        self.mark_dirty(center[0] - extent, center[1] - extent, center[0] + extent + 1, center[1] + extent + 1)
+
+    def circles(self, centers, radius, color):
+        """
+        Filled circles at every (x, y) row of centers. Circles sharing an x,
+        like notes in one lane, are merged into one per-row reach and drawn
+        with a single masked write and a single dirty rect
+        """
+        centers = np.asarray(centers, dtype=np.intp).reshape(-1, 2)
+        if len(centers) == 0:
+            return
+        half_widths = disk_half_widths(radius)
+        offsets = np.arange(-radius, radius + 1)
+
+        for x in np.unique(centers[:, 0]):
+            lane = centers[centers[:, 0] == x, 1]
+            x0, x1 = max(x - radius, 0), min(x + radius + 1, self.width)
+            y0, y1 = max(lane.min() - radius, 0), min(lane.max() + radius + 1, self.height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+
+            # Widest extent any circle reaches on each row of the lane
+            rows = lane[:, None] + offsets - y0
+            valid = (rows >= 0) & (rows < y1 - y0)
+            reach = np.full(y1 - y0, -1, dtype=np.intp)
+            np.maximum.at(reach, rows[valid], np.broadcast_to(half_widths, rows.shape)[valid])
+
+            mask = np.abs(np.arange(x0, x1) - x) <= reach[:, None]
+            solid = solid_patch(self.height, 2 * radius + 1, tuple(color))[:y1 - y0, :x1 - x0]
+            # cv2 does the masked copy into the frame view far faster than np.copyto(where=)
+            cv2.copyTo(solid, mask.view(np.uint8), self.frame[y0:y1, x0:x1])
+            self.mark_dirty(x0, y0, x1, y1)
+
+    def rectangle(self, pt1, pt2, color, thickness=1):
+        cv2.rectangle(self.frame, pt1, pt2, color, thickness)
+        extent = max(thickness, 0) + 1
+        self.mark_dirty(
+            min(pt1[0], pt2[0]) - extent, min(pt1[1], pt2[1]) - extent,
+            max(pt1[0], pt2[0]) + extent + 1, max(pt1[1], pt2[1]) + extent + 1,
+        )
+
+    def line(self, pt1, pt2, color, thickness=1):
+        cv2.line(self.frame, pt1, pt2, color, thickness)
+        extent = thickness + 1
+        self.mark_dirty(
+            min(pt1[0], pt2[0]) - extent, min(pt1[1], pt2[1]) - extent,
+            max(pt1[0], pt2[0]) + extent + 1, max(pt1[1], pt2[1]) + extent + 1,
+        )
+
+    def text(self, text, org, font_scale, color, thickness):
+        rect = draw_text(self.frame, text, org, font_scale, color, thickness)
+        if rect is not None:
+            self.mark_dirty(*rect)
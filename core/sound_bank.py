@@ -0,0 +1,136 @@
+import os
+import threading
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+PIANO_DIR = os.path.join("assets", "piano")
+NOTE_ORDER = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+# Octave the files in assets/piano were recorded in, and the octaves other
+# notes can be pitch-shifted to before they turn to noise or silence
+BASE_OCTAVE = 4
+MIN_OCTAVE = 1
+MAX_OCTAVE = 7
+
+
+def decode_wav(path, channels=2):
+    """
+    Reads a 16-bit PCM WAV into a float32 (frames, channels) array in
+    [-1, 1], duplicating or dropping channels to match. Returns it with the
+    file's sample rate
+    """
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path} is not 16-bit PCM")
+        file_channels = f.getnchannels()
+        sample_rate = f.getframerate()
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2").reshape(-1, file_channels)
+
+    if file_channels == 1:
+        pcm = np.repeat(pcm, channels, axis=1)
+    elif file_channels > channels:
+        pcm = pcm[:, :channels]
+    elif file_channels < channels:
+        raise ValueError(f"{path} has {file_channels} channels, expected {channels}")
+    return np.ascontiguousarray(pcm, dtype=np.float32) / 32768.0, sample_rate
+
+
+def load_piano_samples(piano_dir=PIANO_DIR, channels=2):
+    """
+    Decodes one sample per note from assets/piano, keyed by note name.
+    Returns the samples and their common sample rate
+    """
+    samples = {}
+    sample_rate = None
+    for note in NOTE_ORDER:
+        try:
+            data, rate = decode_wav(os.path.join(piano_dir, f"{note.lower()}.wav"), channels)
+        except (wave.Error, ValueError, FileNotFoundError):
+            print(f"Missing sound for {note}")
+            continue
+        if sample_rate is None:
+            sample_rate = rate
+        elif rate != sample_rate:
+            print(f"Missing sound for {note}: {rate} Hz, expected {sample_rate} Hz")
+            continue
+        samples[note] = data
+    return samples, sample_rate or 44100
+
+
+def pitch_shift(samples, ratio):
+    """
+    Resamples (frames, channels) audio by linear interpolation so it plays
+    ratio times higher and 1/ratio times as long. Shifting up is box
+    filtered first to keep the worst of the aliasing out
+    """
+    if ratio > 1:
+        width = int(round(ratio))
+        summed = np.cumsum(samples, axis=0, dtype=np.float64)
+        summed[width:] = summed[width:] - summed[:-width]
+        samples = (summed[width - 1:] / width).astype(np.float32)
+
+    positions = np.arange(0, len(samples) - 1, ratio)
+    index = positions.astype(np.intp)
+    frac = (positions - index).astype(np.float32)[:, None]
+    return samples[index] + (samples[index + 1] - samples[index]) * frac
+
+
+class SampleBank:
+    """
+    The decoded piano samples plus pitch-shifted copies for other octaves.
+    Copies are made on first use and kept in an LRU holding at most
+    max_bytes of them (the newest is always kept); prefetch() makes them on
+    a background thread ahead of time
+    """
+
+    def __init__(self, samples, sample_rate, base_octave=BASE_OCTAVE, max_bytes=64 * 1024 * 1024):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.base_octave = base_octave
+        self.max_bytes = max_bytes
+        self._variants = OrderedDict()
+        self.cached_bytes = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sample-bank")
+
+    def get(self, note, octave=None):
+        """
+        Sample for note in octave (the recorded octave when None), or None
+        when there is no sample for that note
+        """
+        base = self.samples.get(note)
+        if base is None or octave is None or octave == self.base_octave:
+            return base
+
+        key = (note, octave)
+        with self._lock:
+            variant = self._variants.get(key)
+            if variant is not None:
+                self._variants.move_to_end(key)
+                return variant
+
+        variant = pitch_shift(base, 2.0 ** (octave - self.base_octave))
+        with self._lock:
+            # Made on two threads at once, the first copy stays
+            previous = self._variants.pop(key, None)
+            if previous is not None:
+                variant = previous
+                self.cached_bytes -= previous.nbytes
+            self._variants[key] = variant
+            self.cached_bytes += variant.nbytes
+            while self.cached_bytes > self.max_bytes and len(self._variants) > 1:
+                _, evicted = self._variants.popitem(last=False)
+                self.cached_bytes -= evicted.nbytes
+        return variant
+
+    def prefetch(self, keys):
+        """
+        Makes the (note, octave) variants in keys in the background
+        """
+        keys = list(keys)
+        self._executor.submit(lambda: [self.get(note, octave) for note, octave in keys])
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
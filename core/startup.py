@@ -0,0 +1,82 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Taken when core.app is first imported, before cv2, pyautogui, mediapipe,
+# sounddevice and the scene modules are loaded. The entry scripts import
+# core.app first so their own imports are counted too
+LAUNCH_TIME = time.perf_counter()
+
+
+class StartupTimer:
+    """
+    Records named startup phases (possibly running on several threads) and
+    prints a breakdown relative to launch
+    """
+
+    def __init__(self, launch_time=LAUNCH_TIME):
+        self.launch_time = launch_time
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def record(self, name, start, end):
+        with self._lock:
+            self.phases.append((name, start - self.launch_time, end - start, threading.current_thread().name))
+
+    def timed(self, name, func):
+        """
+        Wraps func so each call is recorded as a phase
+        """
+        def run(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, start, time.perf_counter())
+        return run
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.record(name, now, now)
+
+    def report(self):
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        print("⏱️ Startup breakdown:")
+        for name, offset, duration, thread_name in phases:
+            print(f"   {name:<26} +{offset * 1000:7.1f} ms  {duration * 1000:7.1f} ms  [{thread_name}]")
+
+
+class Preloader:
+    """
+    Runs loaders concurrently in the background, timing each one
+    """
+
+    def __init__(self, timer, max_workers=4):
+        self.timer = timer
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preload")
+        self._futures = {}
+
+    def submit(self, name, func):
+        self._futures[name] = self._executor.submit(self.timer.timed(name, func))
+
+    def ready(self, *names):
+        return all(self._futures[name].done() for name in names)
+
+    def succeeded(self, name):
+        future = self._futures[name]
+        return future.done() and not future.cancelled() and future.exception() is None
+
+    def result(self, name):
+        """
+        Blocks until the named loader finishes and returns its result,
+        re-raising anything it raised
+        """
+        return self._futures[name].result()
+
+    def shutdown(self):
+        """
+        Cancels loaders that have not started and waits for running ones,
+        so whatever they open can still be released
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name_id", "start")
+
+    def __init__(self, tracer, name_id):
+        self.tracer = tracer
+        self.name_id = name_id
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._record(self.name_id, self.start, time.perf_counter())
+        return False
+
+
+class Tracer:
+    """
+    Span recorder for the tracking and render loops. Spans go into a
+    preallocated ring buffer; while disabled span() hands back a shared
+    no-op context manager so instrumented code costs one method call.
+
+        with TRACER.span("face_mesh.process"):
+            results = face_mesh.process(rgb_frame)
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self.enabled = False
+        self.capacity = capacity
+        self._starts = np.zeros(capacity, dtype=np.float64)
+        self._ends = np.zeros(capacity, dtype=np.float64)
+        self._name_ids = np.zeros(capacity, dtype=np.int32)
+        self._thread_ids = np.zeros(capacity, dtype=np.int32)
+        self._count = 0
+        self._lock = threading.Lock()
+
+        self._names = []
+        self._name_lookup = {}
+        self._threads = {}
+        self._thread_names = {}
+        self._origin = time.perf_counter()
+
+        # Per-frame summary for the overlay
+        self._frame_start = None
+        self._frame_first_span = 0
+        self.fps = 0.0
+        self.slowest_stage = None
+        self.slowest_ms = 0.0
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        name_id = self._name_lookup.get(name)
+        if name_id is None:
+            with self._lock:
+                name_id = self._name_lookup.setdefault(name, len(self._names))
+                if name_id == len(self._names):
+                    self._names.append(name)
+        return _Span(self, name_id)
+
+    def _record(self, name_id, start, end):
+        ident = threading.get_ident()
+        with self._lock:
+            thread_id = self._threads.get(ident)
+            if thread_id is None:
+                thread_id = self._threads[ident] = len(self._threads)
+                self._thread_names[thread_id] = threading.current_thread().name
+            slot = self._count % self.capacity
+            self._starts[slot] = start
+            self._ends[slot] = end
+            self._name_ids[slot] = name_id
+            self._thread_ids[slot] = thread_id
+            self._count += 1
+
+    def frame(self):
+        """
+        Marks a frame boundary: updates the live FPS and the slowest stage
+        of the frame that just finished
+        """
+        now = time.perf_counter()
+        if not self.enabled:
+            self._frame_start = None
+            return
+
+        with self._lock:
+            count = self._count
+            first = max(self._frame_first_span, count - self.capacity)
+            if count > first:
+                slots = np.arange(first, count) % self.capacity
+                durations = self._ends[slots] - self._starts[slots]
+                slowest = int(np.argmax(durations))
+                self.slowest_stage = self._names[self._name_ids[slots[slowest]]]
+                self.slowest_ms = float(durations[slowest]) * 1000
+            self._frame_first_span = count
+
+        if self._frame_start is not None:
+            elapsed = now - self._frame_start
+            if elapsed > 0:
+                self.fps = 1.0 / elapsed if not self.fps else 0.9 * self.fps + 0.1 / elapsed
+        self._frame_start = now
+
+    def draw_overlay(self, canvas, audio_latency=None):
+        """
+        Draws live FPS and the slowest stage in the top-right corner, plus
+        the audio engine's measured play-to-speaker latency (seconds) when
+        given. Returns the pixels it covered so the caller can restore them
+        once the frame has been presented
+        """
+        x0, y0 = max(0, canvas.shape[1] - 460), 0
+        x1, y1 = canvas.shape[1], min(canvas.shape[0], 80 if audio_latency is None else 110)
+        saved = (x0, y0, canvas[y0:y1, x0:x1].copy())
+
+        canvas[y0:y1, x0:x1] = 0
+        cv2.putText(canvas, f"FPS: {self.fps:5.1f}", (x0 + 10, y0 + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        if self.slowest_stage:
+            cv2.putText(canvas, f"Slowest: {self.slowest_stage} {self.slowest_ms:.1f} ms", (x0 + 10, y0 + 65), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 200, 255), 2)
+        if audio_latency is not None:
+            cv2.putText(canvas, f"Audio latency: {audio_latency * 1000:.1f} ms", (x0 + 10, y0 + 95), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 200, 0), 2)
+        return saved
+
+    @staticmethod
+    def restore_overlay(canvas, saved):
+        x0, y0, patch = saved
+        canvas[y0:y0 + patch.shape[0], x0:x0 + patch.shape[1]] = patch
+
+    def export_chrome(self, path):
+        """
+        Writes the buffered spans as Chrome Trace Event JSON, which Perfetto
+        and chrome://tracing open directly
+        """
+        with self._lock:
+            count = self._count
+            first = max(0, count - self.capacity)
+            slots = np.arange(first, count) % self.capacity
+            starts = self._starts[slots]
+            ends = self._ends[slots]
+            name_ids = self._name_ids[slots]
+            thread_ids = self._thread_ids[slots]
+            names = list(self._names)
+            thread_names = dict(self._thread_names)
+
+        pid = os.getpid()
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        for start, end, name_id, tid in zip(starts, ends, name_ids, thread_ids):
+            events.append({
+                "name": names[name_id],
+                "ph": "X",
+                "pid": pid,
+                "tid": int(tid),
+                "ts": (start - self._origin) * 1e6,
+                "dur": (end - start) * 1e6,
+            })
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"🧭 Wrote {len(events)} trace events to {path}")
+
+
+# Shared by the app, tracker and scenes
+TRACER = Tracer()
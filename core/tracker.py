@@ -0,0 +1,301 @@
+import time
+
+import cv2
+
+from core.blink import BlinkDetector
+from core.gaze_estimator import GazeEstimator
+from core.landmark_flow import LandmarkFlow
+from core.tracing import TRACER
+
+NOSE_TIP_INDEX = 1
+
+# Downscale step used when inference runs over the frame budget
+SCALE_STEP = 0.85
+# Inferences timed at a new scale before deciding whether it helped, and
+# the fraction of the previous time it has to come in under to be kept
+SCALE_TRIAL_FRAMES = 30
+SCALE_MIN_SAVING = 0.9
+
+
+class TrackingResult:
+    """
+    Everything the screens need from one frame of face tracking
+    """
+
+    def __init__(self, points=None, features=None, ear=None, blink_detected=False, blink_clicked=False, roi=None, scale=1.0):
+        # (478, 3) landmarks normalized to the full frame. points and
+        # features are reused by the next frame's result; copy before storing
+        self.points = points
+        self.features = features
+        self.ear = ear
+        # blink_detected: eyes are currently closed. blink_clicked: a blink
+        # click fired on this frame
+        self.blink_detected = blink_detected
+        self.blink_clicked = blink_clicked
+        self.roi = roi
+        self.scale = scale
+
+    @property
+    def face_found(self):
+        return self.points is not None
+
+    @property
+    def nose(self):
+        """
+        Normalized (x, y) position of the nose tip, or None without a face
+        """
+        if self.points is None:
+            return None
+        return float(self.points[NOSE_TIP_INDEX, 0]), float(self.points[NOSE_TIP_INDEX, 1])
+
+
+class FaceTracker:
+    """
+    Runs a single refined FaceMesh inference per frame and derives the nose
+    cursor position, blink clicks and gaze features from the same landmarks.
+
+    With use_roi the mesh only sees a padded crop around the face found in
+    the previous frame, falling back to the full frame when the face is lost
+    or drifts to the edge of the crop. With frame_budget_ms the input is
+    downscaled while inference keeps running over budget, but a smaller
+    scale is only kept if it measurably cut the inference time; FaceMesh
+    resizes its input to a fixed size, so often it does not, and then the
+    tracker goes back to full scale for good.
+
+    With flow_interval above 1 the mesh only runs every flow_interval
+    frames, and the frames in between follow the previous landmarks with
+    optical flow (see core.landmark_flow). The mesh runs early when the face
+    moves more than flow_max_motion_px in a frame, when the flow cannot be
+    trusted, or while the eyes may be closing, since eyelids are where flow
+    is least reliable and blink clicks need the real landmarks.
+    """
+
+    def __init__(
+        self,
+        blink_detector=None,
+        use_roi=False,
+        roi_padding=0.35,
+        frame_budget_ms=None,
+        min_scale=0.4,
+        build_mesh=True,
+        flow_interval=1,
+        flow_max_motion_px=12.0,
+        flow_min_quality=0.8,
+    ):
+        # Landmark-only replays never run inference, so they can skip
+        # importing mediapipe and loading the model
+        self.face_mesh = None
+        if build_mesh:
+            import mediapipe as mp
+
+            self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5,
+            )
+        self.gaze_estimator = GazeEstimator(face_mesh=self.face_mesh)
+        self.blink = blink_detector or BlinkDetector()
+
+        self.use_roi = use_roi
+        self.roi_padding = roi_padding
+        self.roi = None
+
+        self.frame_budget_ms = frame_budget_ms
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self.inference_ms = 0.0
+        # Smoothed inference time at the scale before the one on trial, and
+        # how many inferences the current scale has been timed over
+        self._previous_scale_ms = None
+        self._scale_samples = 0
+        self._downscale_helps = True
+
+        self.flow = LandmarkFlow(min_quality=flow_min_quality) if flow_interval > 1 else None
+        self.flow_interval = flow_interval
+        self.flow_max_motion_px = flow_max_motion_px
+        self.frames_since_mesh = 0
+        # Frames whose landmarks came from the mesh and from optical flow
+        self.mesh_frames = 0
+        self.flow_frames = 0
+
+    def process(self, frame, timestamp=None):
+        """
+        Takes an already flipped BGR frame and its capture time and returns
+        a TrackingResult
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        frame_h, frame_w = frame.shape[:2]
+
+        gray = None
+        if self.flow is not None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            result = self._propagate(gray, frame_w, frame_h, timestamp)
+            if result is not None:
+                return result
+
+        roi = self.roi if self.use_roi else None
+
+        landmarks = self._infer(frame, roi)
+        if landmarks is None and roi is not None:
+            # Lost the face inside the crop, retry on the full frame
+            roi = None
+            landmarks = self._infer(frame, roi)
+
+        self.mesh_frames += 1
+        if landmarks is None:
+            self.roi = None
+            if self.flow is not None:
+                self.flow.clear()
+            self.blink.update(None, timestamp)
+            return TrackingResult(scale=self.scale)
+
+        points = self.gaze_estimator.landmarks_to_points(landmarks)
+        if roi is not None:
+            self._map_to_frame(points, roi, frame_w, frame_h)
+        if self.use_roi:
+            self.roi = self._next_roi(points, roi, frame_w, frame_h)
+        if self.flow is not None:
+            self.flow.reset(gray, points)
+            self.frames_since_mesh = 0
+
+        return self._result(points, roi, timestamp)
+
+    def _propagate(self, gray, frame_w, frame_h, timestamp):
+        """
+        TrackingResult from optical flow on the previous landmarks, or None
+        when the mesh has to run on this frame
+        """
+        if not self.flow.active or self.frames_since_mesh + 1 >= self.flow_interval or self.blink.closed:
+            return None
+
+        points = self.gaze_estimator.points
+        with TRACER.span("optical_flow"):
+            if not self.flow.track(gray, points):
+                return None
+        if self.flow.motion_px > self.flow_max_motion_px:
+            return None
+        with TRACER.span("extract_features"):
+            features, ear = self.gaze_estimator.features_from_points(points)
+        # A blink may be starting; let the mesh see it
+        if ear < self.blink.open_threshold:
+            return None
+
+        self.frames_since_mesh += 1
+        self.flow_frames += 1
+        if self.use_roi:
+            self.roi = self._next_roi(points, None, frame_w, frame_h)
+        return self._result(points, None, timestamp, features, ear)
+
+    def process_points(self, points, timestamp=None):
+        """
+        Builds a TrackingResult from already known full-frame landmarks,
+        e.g. from a landmark-only recording, or None for no face
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        if points is None:
+            self.blink.update(None, timestamp)
+            return TrackingResult(scale=self.scale)
+        return self._result(self.gaze_estimator.load_points(points), None, timestamp)
+
+    def _result(self, points, roi, timestamp, features=None, ear=None):
+        if features is None:
+            with TRACER.span("extract_features"):
+                features, ear = self.gaze_estimator.features_from_points(points)
+        clicked = self.blink.update(ear, timestamp)
+        return TrackingResult(
+            points=points,
+            features=features,
+            ear=ear,
+            blink_detected=self.blink.closed,
+            blink_clicked=clicked,
+            roi=roi,
+            scale=self.scale,
+        )
+
+    def _infer(self, frame, roi):
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            frame = frame[y0:y1, x0:x1]
+        if self.scale < 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        start = time.perf_counter()
+        with TRACER.span("face_mesh.process"):
+            results = self.face_mesh.process(rgb_frame)
+        self._update_scale((time.perf_counter() - start) * 1000)
+
+        if not results.multi_face_landmarks:
+            return None
+        return results.multi_face_landmarks[0].landmark
+
+    def _update_scale(self, elapsed_ms):
+        self.inference_ms = 0.8 * self.inference_ms + 0.2 * elapsed_ms if self._scale_samples else elapsed_ms
+        self._scale_samples += 1
+        if self.frame_budget_ms is None or not self._downscale_helps or self._scale_samples < SCALE_TRIAL_FRAMES:
+            return
+
+        if self._previous_scale_ms is not None:
+            if self.inference_ms > SCALE_MIN_SAVING * self._previous_scale_ms:
+                # Shrinking the input did not make inference faster, so it
+                # only cost landmark accuracy
+                self._downscale_helps = False
+                self._set_scale(1.0)
+                return
+            self._previous_scale_ms = None
+
+        if self.inference_ms > self.frame_budget_ms and self.scale > self.min_scale:
+            self._previous_scale_ms = self.inference_ms
+            self._set_scale(max(self.min_scale, self.scale * SCALE_STEP))
+        elif self.inference_ms < 0.6 * self.frame_budget_ms and self.scale < 1.0:
+            self._set_scale(min(1.0, self.scale / SCALE_STEP))
+
+    def _set_scale(self, scale):
+        # Timing restarts, since the old average says nothing about the new
+        # input size
+        self.scale = scale
+        self._scale_samples = 0
+
+    @staticmethod
+    def _map_to_frame(points, roi, frame_w, frame_h):
+        """
+        Converts landmarks normalized to the crop into full-frame coordinates
+        """
+        x0, y0, x1, y1 = roi
+        crop_w, crop_h = x1 - x0, y1 - y0
+        points[:, 0] *= crop_w / frame_w
+        points[:, 0] += x0 / frame_w
+        points[:, 1] *= crop_h / frame_h
+        points[:, 1] += y0 / frame_h
+        # FaceMesh z shares the x scale
+        points[:, 2] *= crop_w / frame_w
+
+    def _next_roi(self, points, roi, frame_w, frame_h):
+        min_x, min_y = points[:, 0].min() * frame_w, points[:, 1].min() * frame_h
+        max_x, max_y = points[:, 0].max() * frame_w, points[:, 1].max() * frame_h
+
+        if roi is not None:
+            # Face running into the crop edge means the crop is about to cut
+            # it off, so detect on the full frame next time
+            x0, y0, x1, y1 = roi
+            margin = 2
+            if (min_x <= x0 + margin and x0 > 0) or (min_y <= y0 + margin and y0 > 0) \
+                    or (max_x >= x1 - margin and x1 < frame_w) or (max_y >= y1 - margin and y1 < frame_h):
+                return None
+
+        pad = self.roi_padding * max(max_x - min_x, max_y - min_y)
+        x0 = max(0, int(min_x - pad))
+        y0 = max(0, int(min_y - pad))
+        x1 = min(frame_w, int(max_x + pad))
+        y1 = min(frame_h, int(max_y + pad))
+        if x1 - x0 < 32 or y1 - y0 < 32:
+            return None
+        return x0, y0, x1, y1
+
+    def close(self):
+        if self.face_mesh is not None:
+            self.face_mesh.close()
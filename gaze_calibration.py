@@ -0,0 +1,140 @@
+# First, so the startup report counts the imports below
+from core.app import Scene, run_app
+import cv2
+import numpy as np
+import pyautogui
+from core.calibration_store import CalibrationStore
+from core.cursor import NOSE, GAZE
+from core.gaze_estimator import GazeEstimator
+from core.gaze_model import save_gaze_model
+from core.render import LayerCache, Compositor
+from config import GAZE_CALIBRATION_DIR, GAZE_MODEL_FILE
+
+screen_width, screen_height = pyautogui.size()
+
+UI_MARGIN = 60
+# Seconds to look at each target before and while samples are taken
+SETTLE_TIME = 0.8
+COLLECT_TIME = 1.2
+RESULT_DURATION = 3.0
+MIN_SAMPLES_PER_TARGET = 5
+GAZE_ALPHA = 1.0
+
+def build_targets():
+    """
+    3x3 grid of screen points, inset so every target is comfortably visible
+    """
+    xs = [int(screen_width * f) for f in (0.1, 0.5, 0.9)]
+    ys = [int(screen_height * f) for f in (0.15, 0.5, 0.85)]
+    return [(x, y) for y in ys for x in xs]
+
+targets = build_targets()
+
+def draw_calibration_background(canvas, state):
+    index, result_text = state
+    cv2.putText(canvas, "Gaze Setup", (screen_width//2 - 130, UI_MARGIN), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 2)
+    if result_text is not None:
+        cv2.putText(canvas, result_text, (UI_MARGIN, screen_height//2), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
+        return
+
+    cv2.putText(canvas, "Keep your head still and look at the dot", (screen_width//2 - 330, UI_MARGIN + 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (180, 180, 180), 2)
+    for i, target in enumerate(targets):
+        if i != index:
+            cv2.circle(canvas, target, 8, (80, 80, 80), -1)
+    cv2.circle(canvas, targets[index], 30, (255, 255, 255), 2)
+
+
+class GazeCalibrationScene(Scene):
+    """
+    Shows a grid of targets and records the tracker's eye features while
+    the user looks at each one, then trains and saves the gaze model on
+    these and every earlier run's samples
+    """
+
+    # Drop the stored samples first, for when head position or lighting
+    # changed too much for earlier runs to help
+    from_scratch = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.layers = LayerCache(screen_width, screen_height, draw_calibration_background)
+        self.compositor = Compositor(screen_width, screen_height)
+
+    def enter(self):
+        num_features = len(self.app.tracker.gaze_estimator.subset_indices) * 3
+        self.store = CalibrationStore(GAZE_CALIBRATION_DIR, num_features)
+        if self.from_scratch:
+            self.store.clear()
+        # Samples taken for each target on this run
+        self.target_counts = [0] * len(targets)
+        self.index = 0
+        self.target_start = None
+        self.collecting = False
+        self.result_text = None
+        self.result_start = None
+
+    def exit(self):
+        self.store.close()
+
+    def finish(self, timestamp):
+        self.result_start = timestamp
+        missing = [i for i, count in enumerate(self.target_counts) if count < MIN_SAMPLES_PER_TARGET]
+        if missing:
+            print(f"⚠️ Too few gaze samples for targets {missing}, keeping the current gaze model")
+            self.result_text = "Not enough samples (face lost?), try again"
+            return
+
+        X, y = self.store.samples()
+        estimator = GazeEstimator()
+        estimator.train(X, y, alpha=GAZE_ALPHA)
+        save_gaze_model(estimator, GAZE_MODEL_FILE)
+        error = float(np.mean(np.linalg.norm(estimator.predict(X) - y, axis=1)))
+        print(f"👀 Trained gaze model on {len(X)} samples, mean error {error:.0f} px")
+
+        cursor = self.app.cursor
+        cursor.gaze_model = estimator
+        if cursor.mode == NOSE:
+            cursor.set_mode(GAZE)
+        self.result_text = f"Saved: {len(X)} samples, mean error {error:.0f} px"
+
+    def update(self, tracking, timestamp):
+        if self.result_start is not None:
+            return "menu" if timestamp - self.result_start >= RESULT_DURATION else None
+
+        if self.target_start is None:
+            self.target_start = timestamp
+        elapsed = timestamp - self.target_start
+
+        self.collecting = elapsed >= SETTLE_TIME
+        if self.collecting and tracking.face_found and not tracking.blink_detected:
+            self.store.append(tracking.features, targets[self.index])
+            self.target_counts[self.index] += 1
+
+        if elapsed >= SETTLE_TIME + COLLECT_TIME:
+            self.index += 1
+            self.target_start = timestamp
+            self.collecting = False
+            if self.index == len(targets):
+                self.finish(timestamp)
+        return None
+
+    def render(self):
+        if self.result_text is not None:
+            return self.compositor.begin(self.layers.get((None, self.result_text)))
+
+        canvas = self.compositor.begin(self.layers.get((self.index, None)))
+        color = (0, 255, 0) if self.collecting else (0, 0, 255)
+        self.compositor.circle(targets[self.index], 12, color, -1)
+        return canvas
+
+
+class GazeRecalibrationScene(GazeCalibrationScene):
+    """
+    Gaze setup that forgets every earlier calibration first
+    """
+
+    from_scratch = True
+
+
+if __name__ == "__main__":
+    run_app("gaze_calibration")